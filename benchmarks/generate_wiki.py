@@ -0,0 +1,200 @@
+"""Generate a reproducible synthetic wiki for benchmarking
+
+Usage: python benchmarks/generate_wiki.py --pages 10000 --output /tmp/wiki-10k
+"""
+import argparse
+import os
+import random
+import shutil
+import struct
+import zlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATE = os.path.join(REPO_ROOT, "templates", "note-template.md")
+
+# Fixed date so generated content is byte-for-byte reproducible
+GENERATED_DATE = "2025-01-01"
+
+# Real words mixed into the vocabulary so benchmark queries have realistic hits
+SEED_WORDS = [
+    "docker", "container", "python", "llama", "model", "server", "index",
+    "search", "cache", "kubernetes", "network", "install", "config", "memory",
+    "research", "project", "book", "notes", "startup", "deploy", "streamlit",
+    "markdown", "image", "table", "query", "latency", "thread", "process",
+]
+
+CODE_SAMPLES = [
+    ("python", "def handler(event):\n    items = [x * 2 for x in event['items']]\n    return sum(items)\n"),
+    ("bash", "docker build -t wiki .\ndocker run -p 8501:8501 wiki\n"),
+    ("json", '{\n  "name": "wiki",\n  "pages": 100,\n  "enabled": true\n}\n'),
+    ("", "plain preformatted text\n  with indentation\n"),
+]
+
+
+def tiny_png(rgb):
+    """Build a valid 1x1 PNG of the given color"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    pixels = zlib.compress(b"\x00" + bytes(rgb))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+
+def build_vocabulary(rng, size=2000):
+    """Return a list of pseudo-words, seeded with real words"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set(SEED_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def plan_layout(categories, subcategories, depth):
+    """Return (category names, list of directories relative to categories/)"""
+    category_names = [f"category-{i:02d}" for i in range(categories)]
+    directories = []
+    for category in category_names:
+        directories.append(category)
+        level = [category]
+        for _ in range(depth):
+            next_level = []
+            for parent in level:
+                for j in range(subcategories):
+                    next_level.append(f"{parent}/sub-{j:02d}")
+            directories.extend(next_level)
+            level = next_level
+    return category_names, directories
+
+
+class WikiGenerator:
+    """Deterministically writes pages, links and images into an output directory"""
+
+    def __init__(self, output, seed, template, images):
+        self.output = output
+        self.rng = random.Random(seed)
+        self.template = template
+        self.images = images
+        self.vocabulary = build_vocabulary(self.rng)
+        # Zipf-like weights so a few words are very common
+        self.weights = [1.0 / (rank + 1) for rank in range(len(self.vocabulary))]
+        self.pages = []
+
+    def words(self, count):
+        return self.rng.choices(self.vocabulary, weights=self.weights, k=count)
+
+    def paragraph(self, sentences=4):
+        lines = []
+        for _ in range(sentences):
+            sentence = " ".join(self.words(self.rng.randint(8, 20)))
+            lines.append(sentence.capitalize() + ".")
+        return " ".join(lines)
+
+    def table(self):
+        headers = self.words(3)
+        rows = ["| " + " | ".join(headers) + " |", "|---|---|---|"]
+        for _ in range(self.rng.randint(2, 6)):
+            rows.append("| " + " | ".join(self.words(3)) + " |")
+        return "\n".join(rows)
+
+    def code_block(self):
+        lang, code = self.rng.choice(CODE_SAMPLES)
+        return f"```{lang}\n{code}```"
+
+    def link_to(self, page_path, target_path):
+        rel = os.path.relpath(target_path, os.path.dirname(page_path))
+        title = os.path.basename(target_path)[:-3].replace("-", " ").title()
+        return f"[{title}](./{rel})"
+
+    def page_body(self, page_path, title):
+        sections = [self.paragraph()]
+        for _ in range(self.rng.randint(1, 4)):
+            heading = " ".join(self.words(2)).title()
+            parts = [f"### {heading}", self.paragraph(self.rng.randint(2, 6))]
+            roll = self.rng.random()
+            if roll < 0.4:
+                parts.append(self.code_block())
+            elif roll < 0.6:
+                parts.append(self.table())
+            elif roll < 0.7 and self.images:
+                parts.append(f"![diagram](./{os.path.basename(self.image_for(page_path))})")
+            sections.append("\n\n".join(parts))
+
+        # Cross-links to earlier pages keep every link target valid
+        if self.pages:
+            links = [self.link_to(page_path, target) for target in self.rng.sample(self.pages, min(3, len(self.pages)))]
+            sections.append("### Related\n\n" + "\n".join(f"- {link}" for link in links))
+
+        content = self.template.replace("{{TITLE}}", title).replace("{{DATE}}", GENERATED_DATE)
+        content = content.replace("Brief description goes here.", self.paragraph(2))
+        return content.replace("Main content goes here.", "\n\n".join(sections))
+
+    def image_for(self, page_path):
+        image_path = os.path.join(os.path.dirname(page_path), "diagram.png")
+        full_path = os.path.join(self.output, image_path)
+        if not os.path.exists(full_path):
+            with open(full_path, "wb") as f:
+                f.write(tiny_png(self.rng.choices(range(256), k=3)))
+        return image_path
+
+    def write(self, rel_path, content):
+        full_path = os.path.join(self.output, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def generate(self, pages, categories, subcategories, depth):
+        category_names, directories = plan_layout(categories, subcategories, depth)
+
+        for directory in directories:
+            os.makedirs(os.path.join(self.output, "categories", directory), exist_ok=True)
+
+        for i in range(pages):
+            directory = directories[i % len(directories)]
+            name = "-".join(self.words(3)) + f"-{i}"
+            page_path = os.path.join("categories", directory, f"{name}.md")
+            title = name.replace("-", " ").title()
+            self.write(page_path, self.page_body(page_path, title))
+            self.pages.append(page_path)
+
+        for directory in directories:
+            title = os.path.basename(directory).replace("-", " ").title()
+            if "/" in directory:
+                index_path = os.path.join("categories", directory, "index.md")
+            else:
+                index_path = os.path.join("categories", f"{directory}.md")
+            self.write(index_path, f"# {title}\n\n{self.paragraph(2)}\n")
+
+        links = "\n".join(f"- [{name.title()}](./categories/{name}.md)" for name in category_names)
+        self.write("index.md", f"# Synthetic Wiki\n\n## Categories\n\n{links}\n")
+        return len(self.pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic wiki for benchmarks")
+    parser.add_argument("--pages", type=int, default=100, help="number of content pages")
+    parser.add_argument("--output", required=True, help="directory to write the wiki into")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--categories", type=int, default=4, help="number of top-level categories")
+    parser.add_argument("--subcategories", type=int, default=4, help="subcategories per directory")
+    parser.add_argument("--depth", type=int, default=2, help="levels of subcategory nesting")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="seed page template")
+    parser.add_argument("--no-images", action="store_true", help="do not generate images")
+    parser.add_argument("--force", action="store_true", help="replace an existing output directory")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f"{args.output} already exists (use --force to replace it)")
+        shutil.rmtree(args.output)
+
+    with open(args.template, "r", encoding="utf-8") as f:
+        template = f.read()
+
+    generator = WikiGenerator(args.output, args.seed, template, images=not args.no_images)
+    count = generator.generate(args.pages, args.categories, args.subcategories, args.depth)
+    print(f"Generated {count} pages in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Benchmark the scan, search and render paths against a (synthetic) wiki
+
+Usage:
+    python benchmarks/run_benchmarks.py --pages 1000 --save results.json
+    python benchmarks/run_benchmarks.py --wiki /tmp/wiki-10k --baseline results.json
+
+Each stage reports throughput, p50/p99 latency and peak memory (traced in a
+separate pass so tracemalloc overhead does not skew the timings).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_wiki import SEED_WORDS, WikiGenerator, DEFAULT_TEMPLATE
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def timed(fn, items):
+    """Call fn for each item and return the per-call latencies in seconds"""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def traced_peak(fn, items):
+    """Run fn over items under tracemalloc and return the peak traced bytes"""
+    tracemalloc.start()
+    try:
+        for item in items:
+            fn(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+class BenchmarkContext:
+    """Imports the app modules (after the cache env is set) and holds shared inputs"""
+
+    def __init__(self, args):
+        from personal_wiki.app.utils import file as file_utils
+        from personal_wiki.app.utils import search as search_utils
+
+        self.file_utils = file_utils
+        self.search_utils = search_utils
+        self.iterations = args.iterations
+        self.md_files = file_utils.get_md_files()
+        self.pages = [path for path, _ in file_utils.iter_md_files(self.md_files)]
+
+        rng = random.Random(args.seed)
+        self.queries = [rng.choice(SEED_WORDS) for _ in range(args.queries)]
+        self.render_pages = rng.sample(self.pages, min(args.render_pages, len(self.pages)))
+
+    def reset_tree(self):
+        self.file_utils._tree_cache.clear()
+        self.file_utils._md_files_cache.clear()
+
+    def reset_search_index(self):
+        self.search_utils.search_index_service.index = None
+        snapshot = os.path.join(self.file_utils.CACHE_DIR, self.search_utils.SEARCH_INDEX_SNAPSHOT)
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+
+def stage_scan_cold(ctx):
+    def op(_):
+        ctx.reset_tree()
+        ctx.file_utils.get_md_files()
+    return op, range(ctx.iterations)
+
+
+def stage_scan_warm(ctx):
+    ctx.file_utils.get_md_files()
+    return (lambda _: ctx.file_utils.get_md_files()), range(ctx.iterations)
+
+
+def stage_search_build(ctx):
+    def op(_):
+        ctx.reset_search_index()
+        ctx.search_utils.get_search_index(ctx.md_files)
+    return op, range(1)
+
+
+def stage_search_query(ctx):
+    ctx.search_utils.get_search_index(ctx.md_files)
+    return (lambda query: ctx.search_utils.search_wiki_content(query, ctx.md_files)), ctx.queries
+
+
+def stage_render(ctx):
+    from personal_wiki.app.utils.render import render_segments
+
+    def op(file_path):
+        render_segments(ctx.file_utils.read_md_file(file_path), file_path)
+    return op, ctx.render_pages
+
+
+def stage_import_cold(ctx):
+    # A fresh interpreter per run, so nothing is already imported
+    command = [sys.executable, "-c", "import personal_wiki.app.utils.render, personal_wiki.app.utils.search"]
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+
+    def op(_):
+        subprocess.run(command, check=True, env=env)
+    return op, range(min(ctx.iterations, 5))
+
+
+def stage_render_first(ctx):
+    from personal_wiki.app.utils import markdown as markdown_utils
+    from personal_wiki.app.utils.render import render_segments
+
+    # First render of a fresh session: no converter built on this thread yet
+    def op(file_path):
+        markdown_utils._converters.__dict__.clear()
+        render_segments(ctx.file_utils.read_md_file(file_path), file_path)
+    return op, ctx.render_pages[:20]
+
+
+STAGES = {
+    "import_cold": stage_import_cold,
+    "scan_cold": stage_scan_cold,
+    "scan_warm": stage_scan_warm,
+    "search_build": stage_search_build,
+    "search_query": stage_search_query,
+    "render": stage_render,
+    "render_first": stage_render_first,
+}
+
+
+def run_stage(ctx, name, trace_memory=True):
+    """Run one stage and summarise its latencies"""
+    op, items = STAGES[name](ctx)
+    items = list(items)
+    latencies = timed(op, items)
+    total = sum(latencies)
+
+    result = {
+        "ops": len(latencies),
+        "total_s": total,
+        "throughput_ops_s": len(latencies) / total if total else 0.0,
+        "mean_ms": total / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+    if trace_memory:
+        op, items = STAGES[name](ctx)
+        result["peak_mem_bytes"] = traced_peak(op, items)
+    return result
+
+
+def compare(results, baseline, max_regression):
+    """Print a comparison against a baseline; return the names of regressed stages"""
+    regressions = []
+    print(f"\n{'stage':<14} {'p50 ms':>10} {'base':>10} {'delta':>8} {'ops/s':>10} {'base':>10}")
+    for name, stage in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            print(f"{name:<14} {stage['p50_ms']:>10.3f} {'-':>10}")
+            continue
+        delta = (stage["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100 if base["p50_ms"] else 0.0
+        flag = " !" if delta > max_regression else ""
+        print(
+            f"{name:<14} {stage['p50_ms']:>10.3f} {base['p50_ms']:>10.3f} {delta:>+7.1f}%"
+            f" {stage['throughput_ops_s']:>10.1f} {base['throughput_ops_s']:>10.1f}{flag}"
+        )
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wiki scan, search and render paths")
+    parser.add_argument("--wiki", help="existing wiki directory (containing categories/)")
+    parser.add_argument("--pages", type=int, default=100, help="generate a wiki of this size when --wiki is not given")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for generation and sampling")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages to run")
+    parser.add_argument("--iterations", type=int, default=20, help="repetitions for scan stages")
+    parser.add_argument("--queries", type=int, default=200, help="number of search queries")
+    parser.add_argument("--render-pages", type=int, default=200, help="number of pages to render")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed p50 slowdown in percent")
+    args = parser.parse_args(argv)
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix="wiki-bench-")
+    wiki_dir = args.wiki
+    if wiki_dir is None:
+        wiki_dir = os.path.join(workdir, "wiki")
+        with open(DEFAULT_TEMPLATE, "r", encoding="utf-8") as f:
+            WikiGenerator(wiki_dir, args.seed, f.read(), images=True).generate(args.pages, 4, 4, 2)
+
+    # Caches and the asset store must point at scratch space before the app
+    # modules are imported; they read these paths once, at import time
+    imported = sorted(name for name in sys.modules if name.startswith("personal_wiki."))
+    if imported:
+        raise RuntimeError(f"app modules imported before the scratch directories were set: {', '.join(imported)}")
+    os.environ["WIKI_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["WIKI_STATIC_DIR"] = os.path.join(workdir, "static")
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_path = os.path.abspath(args.save) if args.save else None
+    os.chdir(wiki_dir)
+
+    ctx = BenchmarkContext(args)
+    results = {
+        "meta": {
+            "wiki": os.path.abspath(wiki_dir),
+            "pages": len(ctx.pages),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": {},
+    }
+
+    for name in stages:
+        try:
+            stage = run_stage(ctx, name, trace_memory=not args.no_memory)
+        except ImportError as e:
+            print(f"{name:<14} skipped ({e})")
+            continue
+        results["stages"][name] = stage
+        peak = stage.get("peak_mem_bytes")
+        peak_text = f" peak {peak / 1024 / 1024:.1f} MiB" if peak is not None else ""
+        print(
+            f"{name:<14} {stage['ops']:>6} ops  {stage['throughput_ops_s']:>10.1f} ops/s"
+            f"  p50 {stage['p50_ms']:.3f} ms  p99 {stage['p99_ms']:.3f} ms{peak_text}"
+        )
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {save_path}")
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\nRegressed beyond {args.max_regression}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Import from the app package
+from personal_wiki.app.tools.static_build import main
+
+if __name__ == "__main__":
+    sys.exit(main())
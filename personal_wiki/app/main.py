@@ -1,8 +1,13 @@
 import streamlit as st
-from personal_wiki.app.utils.file import get_md_files
+from personal_wiki.app.utils.service import shared_md_files
 from personal_wiki.app.ui.sidebar import create_sidebar_navigation
 from personal_wiki.app.ui.content import handle_file_selection, display_content
 from personal_wiki.app.ui.css import local_css
+from personal_wiki.app.ui.theme import configured_theme
+from personal_wiki.app.ui.debug import debug_enabled, show_debug_panel
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.highlight import DEFAULT_THEME, PREHIGHLIGHT, start_prehighlight
+from personal_wiki.app.utils.prefetch import prefetch_linked_pages
 
 # Set page configuration
 st.set_page_config(
@@ -14,20 +19,41 @@ st.set_page_config(
 
 def main():
     """Main application entrypoint"""
+    timings = {}
+
     # Initialize UI
-    local_css()
+    with metrics.timed("css", timings):
+        local_css()
+
+    # Get wiki structure (shared by all sessions)
+    with metrics.timed("scan", timings):
+        md_files = shared_md_files()
 
-    # Get wiki structure
-    md_files = get_md_files()
+    # Optionally highlight every code block ahead of the first views, in the theme sessions start with
+    if PREHIGHLIGHT:
+        start_prehighlight(md_files, (configured_theme() or DEFAULT_THEME,))
 
     # Set up navigation
-    create_sidebar_navigation(md_files)
+    with metrics.timed("sidebar", timings):
+        create_sidebar_navigation(md_files)
 
     # Handle file selection
-    selected_file_path = handle_file_selection()
+    with metrics.timed("selection", timings):
+        selected_file_path = handle_file_selection()
 
     # Display content
-    display_content(selected_file_path)
+    with metrics.timed("content", timings):
+        display_content(selected_file_path, md_files)
+
+    # Render the likely next pages while the reader is on this one
+    if st.session_state.get("prefetch_links"):
+        prefetch_linked_pages(selected_file_path, md_files)
+
+    metrics.record_rerun(timings, file=selected_file_path)
+
+    # Optional debug panel with per-stage timings and counters
+    if debug_enabled():
+        show_debug_panel(timings)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import sys
+import time
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
+
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.cache import LRUCache
+from personal_wiki.app.utils.file import get_md_files, iter_md_files, read_md_file
+
+# Bump when the response layout changes so clients drop cached ETags
+API_VERSION = 1
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 512
+
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+
+MAX_HEADER_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+# Compressed bodies keyed by ETag, so repeated requests are gzipped once
+_gzip_cache = LRUCache(16 * 1024 * 1024)
+metrics.register_collector("api_gzip_cache", _gzip_cache.stats)
+
+
+class WikiAPI:
+    """Routes /tree, /page and /search onto the wiki utils modules"""
+
+    def __init__(self, tree_ttl=1.0):
+        self.tree_ttl = tree_ttl
+        self._tree_checked = 0.0
+        self._md_files = None
+        self._pages = frozenset()
+        self._tree_body = None
+
+    def md_files(self):
+        """Return the wiki tree, revalidating it at most once per tree_ttl seconds"""
+        now = time.monotonic()
+        if self._md_files is None or now - self._tree_checked >= self.tree_ttl:
+            md_files = get_md_files()
+            if md_files is not self._md_files:
+                self._md_files = md_files
+                self._pages = frozenset(["index.md"] + [path for path, _ in iter_md_files(md_files)])
+                self._tree_body = None
+            self._tree_checked = now
+        return self._md_files
+
+    def tree(self):
+        md_files = self.md_files()
+        if self._tree_body is None:
+            body = json_body(md_files)
+            self._tree_body = (body, etag_for(body))
+        body, etag = self._tree_body
+        return 200, body, etag
+
+    def page_meta(self, file_path, md_files):
+        """Return (catalog row, links, backlinks) of a page, refreshing the catalog and link graph"""
+        from personal_wiki.app.utils.catalog import get_catalog
+        from personal_wiki.app.utils.link_graph import get_link_graph, link_graph_service
+
+        page = get_catalog(md_files).get(file_path)
+        graph = get_link_graph(md_files)
+        with link_graph_service.read():
+            links = graph.outgoing(file_path)
+            backlinks = graph.linked_from(file_path)
+        return page, links, backlinks
+
+    def page_etag(self, file_path, meta):
+        """Return the ETag of a page without rendering it
+
+        Besides the file's (path, mtime, size) it covers the catalog row,
+        links and backlinks, so a new backlink changes the ETag too.
+        """
+        from personal_wiki.app.utils.render import render_key
+
+        state = json.dumps([API_VERSION, render_key(file_path), meta], sort_keys=True, default=list)
+        return etag_for(state.encode("utf-8"))
+
+    def page(self, file_path, meta):
+        from personal_wiki.app.tools.static_build import segments_to_html
+        from personal_wiki.app.utils.markdown import extract_title
+        from personal_wiki.app.utils.render import get_rendered_segments
+
+        page, links, backlinks = meta
+        body = {
+            "path": file_path,
+            "title": page["title"] if page else extract_title(read_md_file(file_path)),
+            "html": segments_to_html(get_rendered_segments(file_path)),
+            "links": links,
+            "backlinks": backlinks,
+        }
+        if page:
+            body.update({
+                "mtime": page["mtime"],
+                "size": page["size"],
+                "sha256": page["sha256"],
+                "word_count": page["word_count"],
+                "headings": page["headings"],
+                "front_matter": page["front_matter"],
+            })
+        return json_body(body)
+
+    def search(self, query, mode, limit, md_files):
+        from personal_wiki.app.utils.search import iter_search_results
+
+        results = list(iter_search_results(query, md_files, limit=limit, mode=mode))
+        return json_body({"query": query, "mode": mode, "results": results})
+
+    async def handle(self, target, headers):
+        """Return (status, body, etag) for a request"""
+        url = urlsplit(target)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        loop = asyncio.get_running_loop()
+        # Tree state is only touched on the event loop; workers get a reference
+        md_files = self.md_files()
+
+        if url.path == "/tree":
+            return self.tree()
+
+        if url.path == "/page":
+            file_path = params.get("file")
+            if not file_path:
+                return 400, json_body({"error": "missing file parameter"}), None
+            # Only wiki pages are served, never arbitrary paths
+            if file_path not in self._pages:
+                return 404, json_body({"error": f"unknown page {file_path}"}), None
+            try:
+                meta = await loop.run_in_executor(None, self.page_meta, file_path, md_files)
+                etag = self.page_etag(file_path, meta)
+            except OSError:
+                return 404, json_body({"error": f"unknown page {file_path}"}), None
+            if etag_matches(headers.get("if-none-match"), etag):
+                return 304, b"", etag
+            with metrics.timed("api_page"):
+                body = await loop.run_in_executor(None, self.page, file_path, meta)
+            return 200, body, etag
+
+        if url.path == "/search":
+            from personal_wiki.app.utils.search import SEARCH_MODES, MAX_RESULTS
+
+            query = params.get("q", "").strip()
+            mode = params.get("mode", "ranked")
+            if not query:
+                return 400, json_body({"error": "missing q parameter"}), None
+            if mode not in SEARCH_MODES:
+                return 400, json_body({"error": f"mode must be one of {', '.join(SEARCH_MODES)}"}), None
+            try:
+                limit = max(1, int(params.get("limit", MAX_RESULTS)))
+            except ValueError:
+                return 400, json_body({"error": "limit must be an integer"}), None
+            with metrics.timed("api_search"):
+                body = await loop.run_in_executor(None, self.search, query, mode, limit, md_files)
+            return 200, body, etag_for(body)
+
+        return 404, json_body({"error": f"no route for {url.path}"}), None
+
+
+def json_body(obj):
+    return json.dumps(obj, ensure_ascii=False, default=list).encode("utf-8")
+
+
+def etag_for(body):
+    """Return a strong ETag derived from the response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Return True if an If-None-Match header matches the ETag (weak comparison)"""
+    if not if_none_match or etag is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def gzip_body(body, etag):
+    """Return the gzipped body, reusing earlier compressions of the same ETag"""
+    if etag is None:
+        return gzip.compress(body, compresslevel=5)
+    compressed = _gzip_cache.get(etag)
+    if compressed is None:
+        compressed = gzip.compress(body, compresslevel=5)
+        _gzip_cache.put(etag, compressed)
+    return compressed
+
+
+async def read_request(reader):
+    """Return (method, target, version, headers) or None when the client closes the connection"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        return "too large"
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        return "bad request"
+
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def build_response(status, body, etag, headers, head_only, keep_alive):
+    """Serialise a response, compressing it when the client accepts gzip"""
+    response_headers = [
+        ("Content-Type", "application/json; charset=utf-8"),
+        ("Vary", "Accept-Encoding"),
+        ("Connection", "keep-alive" if keep_alive else "close"),
+    ]
+    if etag is not None:
+        response_headers.append(("ETag", etag))
+        response_headers.append(("Cache-Control", "no-cache"))
+
+    if status != 304 and len(body) >= GZIP_MIN_BYTES and "gzip" in headers.get("accept-encoding", ""):
+        body = gzip_body(body, etag)
+        response_headers.append(("Content-Encoding", "gzip"))
+
+    if status == 304:
+        body = b""
+    else:
+        response_headers.append(("Content-Length", str(len(body))))
+
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+    lines.extend(f"{name}: {value}" for name, value in response_headers)
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head if head_only else head + body
+
+
+async def serve_connection(api, reader, writer):
+    """Serve requests on one connection until the client or the timeout closes it"""
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            if isinstance(request, str):
+                status = 431 if request == "too large" else 400
+                writer.write(build_response(status, json_body({"error": request}), None, {}, False, False))
+                break
+
+            method, target, version, headers = request
+            connection = headers.get("connection", "").lower()
+            if version == "HTTP/1.0":
+                keep_alive = connection == "keep-alive"
+            else:
+                keep_alive = connection != "close"
+
+            metrics.incr("api_requests")
+            if method not in ("GET", "HEAD"):
+                status, body, etag = 405, json_body({"error": "only GET and HEAD are supported"}), None
+            else:
+                try:
+                    status, body, etag = await api.handle(target, headers)
+                except Exception as e:
+                    print(f"Error handling {target}: {e}")
+                    status, body, etag = 500, json_body({"error": "internal error"}), None
+
+            if status == 200 and etag_matches(headers.get("if-none-match"), etag):
+                status, body = 304, b""
+
+            writer.write(build_response(status, body, etag, headers, method == "HEAD", keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, tree_ttl):
+    api = WikiAPI(tree_ttl=tree_ttl)
+    # Build the tree before the first request rather than during it
+    api.md_files()
+    server = await asyncio.start_server(partial(serve_connection, api), host, port, limit=MAX_HEADER_BYTES)
+    print(f"Serving the wiki API on http://{host}:{port} (/tree, /page?file=, /search?q=)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve wiki pages, tree and search over HTTP without Streamlit")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--tree-ttl", type=float, default=1.0, help="seconds between wiki tree revalidations")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.tree_ttl))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from personal_wiki.app.utils.file import CACHE_DIR, CATEGORIES_DIR, read_md_prefix, write_text_atomic
+from personal_wiki.app.utils.indexing import page_title, title_case
+
+# Bump when the generated block changes so every index is regenerated
+GENERATOR_VERSION = 1
+
+MANIFEST_PATH = os.path.join(CACHE_DIR, "index-manifest.json")
+
+BLOCK_START = "<!-- index:start (generated by generate_indexes.py; edit outside this block) -->"
+BLOCK_END = "<!-- index:end -->"
+BLOCK_PATTERN = re.compile(r"<!-- index:start.*?-->.*?<!-- index:end -->\n?", re.DOTALL)
+
+# Headings left empty by old versions of add_index_files.sh
+BROKEN_HEADING_PATTERN = re.compile(r"^#\s*(Documentation and resources related to\s+in the\s+category\.)?\s*$")
+
+HEADING_PATTERN = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+
+# Lines a generated section may replace: list items, placeholders and blank lines
+LISTING_LINE_PATTERN = re.compile(r"^(\s*[-*] .*|[*_]No (pages|subcategories) yet\..*|\s*)$")
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the generator manifest, or an empty one if missing or from another version"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": GENERATOR_VERSION, "dirs": {}}
+    if manifest.get("version") != GENERATOR_VERSION:
+        return {"version": GENERATOR_VERSION, "dirs": {}}
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Atomically write the generator manifest"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_text_atomic(path, json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def stat_of(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+
+def scan_directories(root):
+    """Return {dir: {"files": {name: stat}, "subdirs": [names], "index": stat}} for every directory below root"""
+    dirs = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        if dir_path == root:
+            continue
+        files = {}
+        for name in sorted(file_names):
+            if name.endswith(".md") and name != "index.md":
+                files[name] = stat_of(os.path.join(dir_path, name))
+        dirs[dir_path] = {
+            "files": files,
+            "subdirs": list(dir_names),
+            "index": stat_of(os.path.join(dir_path, "index.md")),
+        }
+    return dirs
+
+
+def signature(dirs, dir_path):
+    """Return what a directory's index depends on: its pages and its subdirectories' index files"""
+    info = dirs[dir_path]
+    return {
+        "files": info["files"],
+        "subdirs": {name: dirs.get(os.path.join(dir_path, name), {}).get("index") for name in info["subdirs"]},
+    }
+
+
+def heading_title(index_path, name):
+    """Return the H1 of a directory's index.md, or a title from the directory name"""
+    try:
+        text, _ = read_md_prefix(index_path)
+    except OSError:
+        return title_case(name)
+    first_line = text.split("\n", 1)[0]
+    match = HEADING_PATTERN.search(text)
+    if BROKEN_HEADING_PATTERN.match(first_line) or not match:
+        return title_case(name)
+    return match.group(1).strip()
+
+
+def build_block(pages, subdirs, main_category):
+    """Return the generated listing for a directory's index.md"""
+    lines = [BLOCK_START, "## Pages", ""]
+    lines += [f"- [{title}](./{name})" for name, title in pages] or ["*No pages yet.*"]
+    if subdirs or main_category:
+        lines += ["", "## Subcategories", ""]
+        lines += [f"- [{title}](./{name}/index.md)" for name, title in subdirs] or ["*No subcategories yet.*"]
+    lines.append(BLOCK_END)
+    return "\n".join(lines) + "\n"
+
+
+def new_index_text(title, parent_title):
+    """Return the opening of a new index.md, as add_index_files.sh writes it"""
+    return (
+        f"# {title}\n\n"
+        f"Documentation and resources related to {title} in the {parent_title} category.\n\n"
+        f"## Overview\n\n"
+        f"This section contains information, tutorials, and references about {title}.\n\n"
+    )
+
+
+def remove_listing_sections(text):
+    """Remove hand-written "## Pages" / "## Subcategories" sections that hold only lists
+
+    Returns (text before, text after) the first removed section, or (text, None)
+    if there was nothing to remove.
+    """
+    lines = text.split("\n")
+    kept, at = [], None
+    i = 0
+    while i < len(lines):
+        if lines[i].strip() in ("## Pages", "## Subcategories"):
+            end = i + 1
+            while end < len(lines) and not lines[end].startswith("#"):
+                end += 1
+            if all(LISTING_LINE_PATTERN.match(line) for line in lines[i + 1:end]):
+                if at is None:
+                    at = len(kept)
+                i = end
+                continue
+        kept.append(lines[i])
+        i += 1
+    if at is None:
+        return text, None
+    return "\n".join(kept[:at]).rstrip("\n") + "\n\n", "\n".join(kept[at:]).lstrip("\n")
+
+
+def merge_block(text, block):
+    """Put the generated block into an index's text, replacing the previous one"""
+    if BLOCK_PATTERN.search(text):
+        return BLOCK_PATTERN.sub(lambda _: block, text, count=1)
+
+    before, after = remove_listing_sections(text)
+    if after is None:
+        return text.rstrip("\n") + "\n\n" + block
+    return before + block + ("\n" + after if after.strip() else "")
+
+
+def generate_index(task):
+    """Regenerate one directory's index.md; return (dir, titles, block hash, action)"""
+    dir_path, files, subdirs, cached_titles, main_category, dry_run = task
+    index_path = os.path.join(dir_path, "index.md")
+    name = os.path.basename(dir_path)
+
+    # Page titles come from a bounded prefix read, reused while a page is unchanged
+    titles = {}
+    for file_name, stat in files.items():
+        cached = cached_titles.get(file_name)
+        if cached and cached[0] == stat:
+            titles[file_name] = cached
+            continue
+        text, _ = read_md_prefix(os.path.join(dir_path, file_name))
+        titles[file_name] = [stat, page_title(text, file_name)]
+
+    pages = sorted(((file_name, entry[1]) for file_name, entry in titles.items()), key=lambda page: page[1].lower())
+    subdir_titles = sorted(
+        ((sub, heading_title(os.path.join(dir_path, sub, "index.md"), sub)) for sub in subdirs),
+        key=lambda subdir: subdir[1].lower(),
+    )
+    block = build_block(pages, subdir_titles, main_category)
+
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            old_text = f.read()
+        text = old_text
+        first_line, sep, rest = text.partition("\n")
+        if BROKEN_HEADING_PATTERN.match(first_line):
+            # Also fill in the template lines that lost the title the same way
+            title = title_case(name)
+            rest = rest.replace("references about .", f"references about {title}.")
+            text = f"# {title}{sep}{rest}"
+        action = "update"
+    else:
+        parent_name = os.path.basename(os.path.dirname(dir_path))
+        old_text = None
+        text = new_index_text(title_case(name), title_case(parent_name))
+        action = "create"
+
+    block_hash = hashlib.sha256(block.encode("utf-8")).hexdigest()
+    text = merge_block(text, block)
+    if text == old_text:
+        return dir_path, titles, block_hash, None
+    if not dry_run:
+        write_text_atomic(index_path, text)
+    return dir_path, titles, block_hash, action
+
+
+def generate_indexes(root=CATEGORIES_DIR, jobs=None, dry_run=False, force=False, manifest_path=MANIFEST_PATH):
+    """Regenerate the index.md of every directory whose contents changed since the last run"""
+    manifest = load_manifest(manifest_path)
+    previous = manifest["dirs"]
+    dirs = scan_directories(root)
+
+    tasks = []
+    for dir_path, info in dirs.items():
+        entry = previous.get(dir_path)
+        if (
+            force
+            or entry is None
+            or entry["signature"] != signature(dirs, dir_path)
+            or entry["index"] != info["index"]
+        ):
+            main_category = os.path.dirname(dir_path) == os.path.normpath(root)
+            cached_titles = entry["titles"] if entry else {}
+            tasks.append((dir_path, info["files"], info["subdirs"], cached_titles, main_category, dry_run))
+
+    results = {}
+    written = 0
+    if tasks:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for dir_path, titles, block_hash, action in pool.map(generate_index, tasks, chunksize=8):
+                results[dir_path] = (titles, block_hash)
+                if action:
+                    written += 1
+                    prefix = "[DRY RUN] Would " if dry_run else ""
+                    print(f"{prefix}{action} {os.path.join(dir_path, 'index.md')}")
+
+    summary = {"checked": len(dirs), "regenerated": len(tasks), "written": written}
+    if dry_run:
+        return summary
+
+    # Record the index files as they are after writing, so the next run sees them unchanged
+    for dir_path in results:
+        dirs[dir_path]["index"] = stat_of(os.path.join(dir_path, "index.md"))
+    new_dirs = {}
+    for dir_path, info in dirs.items():
+        if dir_path in results:
+            titles, block_hash = results[dir_path]
+        else:
+            titles, block_hash = previous[dir_path]["titles"], previous[dir_path]["hash"]
+        new_dirs[dir_path] = {
+            "signature": signature(dirs, dir_path),
+            "index": info["index"],
+            "titles": titles,
+            "hash": block_hash,
+        }
+    save_manifest({"version": GENERATOR_VERSION, "dirs": new_dirs}, manifest_path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or refresh the index.md listing of every category directory")
+    parser.add_argument("--root", default=CATEGORIES_DIR, help="directory tree to index (default: categories)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="show which index files would change without writing")
+    parser.add_argument("--force", action="store_true", help="regenerate every index, ignoring the manifest")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = generate_indexes(args.root, jobs=args.jobs, dry_run=args.dry_run, force=args.force)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Checked {summary['checked']} directories, regenerated {summary['regenerated']}, "
+        f"wrote {summary['written']} index files in {elapsed:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
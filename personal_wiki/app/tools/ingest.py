@@ -0,0 +1,305 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import time
+
+from personal_wiki.app.utils.file import CATEGORIES_DIR, write_text_atomic
+from personal_wiki.app.utils.indexing import page_title, title_case
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+TEMPLATES_DIR = os.path.join(REPO_ROOT, "templates")
+DEFAULT_TEMPLATE = "note-template.md"
+MAIN_INDEX = os.path.join(REPO_ROOT, "index.md")
+
+# Pages go to the wiki's categories, as the app (run from personal_wiki/) sees them,
+# wherever the tool is run from, so the main index links always resolve
+DEFAULT_CATEGORIES_DIR = os.path.join(REPO_ROOT, "personal_wiki", CATEGORIES_DIR)
+
+# Same list add_wiki.sh checks against; other categories are created with a warning
+STANDARD_CATEGORIES = ("technology", "books", "projects", "notes")
+
+# Placeholder lines left by add_index_files.sh, dropped once a section gets entries
+PLACEHOLDER_PATTERN = re.compile(r"^[*_]No (pages|subcategories) yet\..*[*_]\s*$")
+
+
+def slugify(name):
+    """Turn a file or page name into the kebab-case used for wiki file names"""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def load_manifest(path):
+    """Read a JSON lines manifest of {"category", "name", "title"?, "source"?, "template"?}"""
+    entries = []
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "category" not in entry or "name" not in entry:
+                raise ValueError(f"{path}:{line_number}: entries need a category and a name")
+            if entry.get("source"):
+                entry["source"] = os.path.join(base_dir, entry["source"])
+            entries.append(entry)
+    return entries
+
+
+def scan_directory(source_dir, category=""):
+    """Return manifest entries for the markdown files of a directory
+
+    Each file's directory, relative to source_dir and below category,
+    becomes its category: notes/ideas/x.md is page x in notes/ideas.
+    """
+    entries = []
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, source_dir)
+        parts = [part for part in category.split("/") if part]
+        if rel_dir != ".":
+            parts += rel_dir.split(os.sep)
+        for file_name in sorted(file_names):
+            if file_name.endswith(".md"):
+                entries.append({
+                    "category": "/".join(slugify(part) for part in parts),
+                    "name": file_name[:-3],
+                    "source": os.path.join(dir_path, file_name),
+                })
+    return entries
+
+
+def render_page(entry, templates, date):
+    """Return (title, markdown) for a manifest entry
+
+    Pages without a source are instantiated from their template. Imported
+    content replaces {{CONTENT}} when the template has it, and is otherwise
+    used as is (given a title heading if it has none).
+    """
+    template = templates[entry.get("template") or DEFAULT_TEMPLATE]
+    content = None
+    if entry.get("source"):
+        with open(entry["source"], "r", encoding="utf-8") as f:
+            content = f.read()
+
+    name = slugify(entry["name"])
+    if entry.get("title"):
+        title = entry["title"]
+    elif content:
+        title = page_title(content, name)
+    else:
+        title = title_case(name)
+
+    if content is not None and "{{CONTENT}}" not in template:
+        if re.search(r"^#\s+", content, re.MULTILINE):
+            return title, content
+        return title, f"# {title}\n\n{content}"
+
+    text = template.replace("{{TITLE}}", title).replace("{{DATE}}", date)
+    return title, text.replace("{{CONTENT}}", content or "")
+
+
+def category_parts(category):
+    return [slugify(part) for part in category.split("/") if part.strip()]
+
+
+def category_page_text(title):
+    return f"# {title}\n\nDocumentation and notes related to {title}.\n\n## Pages\n\n## Subcategories\n"
+
+
+def directory_index_text(title, parent_title, main_category):
+    """Return the index.md add_index_files.sh creates for a directory"""
+    text = (
+        f"# {title}\n\n"
+        f"Documentation and resources related to {title} in the {parent_title} category.\n\n"
+        f"## Overview\n\n"
+        f"This section contains information, tutorials, and references about {title}.\n\n"
+        f"## Pages\n\n"
+        f"*No pages yet. Add content using the `add_wiki.sh` script.*\n"
+    )
+    if main_category:
+        text += "\n## Subcategories\n\n*No subcategories yet.*\n"
+    return text
+
+
+def link_target(line):
+    """Return the link target of a "- [title](target)" list line"""
+    return line.rsplit("](", 1)[1].rstrip(")")
+
+
+def insert_entries(text, heading, lines):
+    """Insert list lines directly under a heading, adding the section if it is missing
+
+    Lines linking to a target the text already links to are skipped.
+    Returns (new text, number of lines inserted).
+    """
+    def linked(target):
+        bare = target[2:] if target.startswith("./") else target
+        return f"]({bare})" in text or f"](./{bare})" in text
+
+    lines = [line for line in dict.fromkeys(lines) if not linked(link_target(line))]
+    if not lines:
+        return text, 0
+
+    doc = text.rstrip("\n").split("\n")
+    if heading not in doc:
+        doc += ["", heading]
+    start = doc.index(heading) + 1
+
+    # Drop the "No pages yet" placeholders left in the section
+    end = start
+    while end < len(doc) and not doc[end].startswith("#"):
+        if PLACEHOLDER_PATTERN.match(doc[end].strip()):
+            del doc[end]
+        else:
+            end += 1
+
+    at = start
+    while at < end and not doc[at].strip():
+        at += 1
+    if at == end:
+        # An empty section: one blank line around the list
+        doc[start:end] = [""] + lines + ([""] if end < len(doc) else [])
+    else:
+        doc[at:at] = lines
+    return "\n".join(doc) + "\n", len(lines)
+
+
+class Ingest:
+    """Pages to write and index entries to add, applied with one write per file"""
+
+    def __init__(self, categories_dir, main_index, date):
+        self.categories_dir = categories_dir
+        self.main_index = main_index
+        self.date = date
+        self.pages = {}
+        self.new_files = {}
+        # {file path: {heading: [list lines]}}
+        self.updates = {}
+
+    def add_update(self, path, heading, line):
+        self.updates.setdefault(path, {}).setdefault(heading, []).append(line)
+
+    def ensure_category(self, parts):
+        """Plan the category page and directory index.md files a category needs"""
+        main = parts[0]
+        main_title = title_case(main)
+        main_page = os.path.join(self.categories_dir, f"{main}.md")
+        if not os.path.exists(main_page):
+            self.new_files.setdefault(main_page, category_page_text(main_title))
+
+        dirs = [(os.path.join(self.categories_dir, main), main_title, "Categories", True)]
+        if len(parts) == 2:
+            dirs.append((os.path.join(self.categories_dir, main, parts[1]), title_case(parts[1]), main_title, False))
+            self.add_update(main_page, "## Subcategories", f"- [{title_case(parts[1])}](./{main}/{parts[1]}/index.md)")
+        for dir_path, title, parent_title, main_category in dirs:
+            index_path = os.path.join(dir_path, "index.md")
+            if not os.path.exists(index_path):
+                self.new_files.setdefault(index_path, directory_index_text(title, parent_title, main_category))
+
+    def add_page(self, entry, title, text):
+        """Plan a page and its links from the category index and the main index"""
+        parts = category_parts(entry["category"])
+        name = slugify(entry["name"])
+        page_path = os.path.join(self.categories_dir, *parts, f"{name}.md")
+        self.ensure_category(parts)
+        self.pages[page_path] = text
+
+        if len(parts) == 1:
+            self.add_update(os.path.join(self.categories_dir, f"{parts[0]}.md"), "## Pages", f"- [{title}](./{parts[0]}/{name}.md)")
+        else:
+            self.add_update(os.path.join(self.categories_dir, *parts, "index.md"), "## Pages", f"- [{title}](./{name}.md)")
+
+        link = os.path.relpath(os.path.abspath(page_path), os.path.dirname(os.path.abspath(self.main_index)))
+        self.add_update(self.main_index, "## Recent Updates", f"- {self.date}: [{title}]({link.replace(os.sep, '/')})")
+        return page_path
+
+    def apply(self, dry_run=False):
+        """Write the pages, then each index file once; return the number of index files written"""
+        for path, text in sorted(self.pages.items()):
+            if dry_run:
+                print(f"[DRY RUN] Would write {path}")
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_text_atomic(path, text)
+
+        written = 0
+        for path in sorted(set(self.new_files) | set(self.updates)):
+            if path in self.new_files:
+                text = self.new_files[path]
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+
+            inserted = 0
+            for heading, lines in self.updates.get(path, {}).items():
+                text, count = insert_entries(text, heading, lines)
+                inserted += count
+            if path not in self.new_files and not inserted:
+                continue
+
+            action = "create" if path in self.new_files else f"add {inserted} entries to"
+            if dry_run:
+                print(f"[DRY RUN] Would {action} {path}")
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            write_text_atomic(path, text)
+            written += 1
+        return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import many pages at once and update the wiki indexes in one pass")
+    parser.add_argument("source", help="directory of markdown files, or a JSON lines manifest")
+    parser.add_argument("--category", default="", help="category for a directory's top-level files (e.g. notes/ideas)")
+    parser.add_argument("--templates", default=TEMPLATES_DIR, help="templates directory (default: templates/)")
+    parser.add_argument("--categories-dir", default=DEFAULT_CATEGORIES_DIR, help="categories directory pages are written to (default: personal_wiki/categories)")
+    parser.add_argument("--main-index", default=MAIN_INDEX, help="main index whose Recent Updates list gets the new pages")
+    parser.add_argument("--overwrite", action="store_true", help="replace pages that already exist")
+    parser.add_argument("--dry-run", action="store_true", help="show what would be written without writing")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if os.path.isdir(args.source):
+        entries = scan_directory(args.source, args.category)
+    else:
+        entries = load_manifest(args.source)
+
+    templates = {}
+    for entry in entries:
+        name = entry.get("template") or DEFAULT_TEMPLATE
+        if name not in templates:
+            with open(os.path.join(args.templates, name), "r", encoding="utf-8") as f:
+                templates[name] = f.read()
+
+    date = datetime.date.today().isoformat()
+    ingest = Ingest(args.categories_dir, args.main_index, date)
+    skipped = 0
+    warned = set()
+    for entry in entries:
+        parts = category_parts(entry["category"])
+        if not 1 <= len(parts) <= 2:
+            print(f"Skipping {entry['name']}: category must be <category> or <category>/<subcategory>, got {entry['category']!r}")
+            skipped += 1
+            continue
+        if parts[0] not in STANDARD_CATEGORIES and parts[0] not in warned:
+            warned.add(parts[0])
+            print(f"Warning: '{parts[0]}' is not a standard category ({', '.join(STANDARD_CATEGORIES)})")
+
+        page_path = os.path.join(args.categories_dir, *parts, f"{slugify(entry['name'])}.md")
+        if os.path.exists(page_path) and not args.overwrite:
+            print(f"Skipping {page_path}: already exists (use --overwrite to replace it)")
+            skipped += 1
+            continue
+        title, text = render_page(entry, templates, date)
+        ingest.add_page(entry, title, text)
+
+    written = ingest.apply(args.dry_run)
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {len(ingest.pages)} pages ({skipped} skipped), wrote {written} index files in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
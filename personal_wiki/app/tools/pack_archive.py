@@ -0,0 +1,70 @@
+import argparse
+import mimetypes
+import os
+import sys
+import time
+
+from personal_wiki.app.utils.file import get_md_files, CATEGORIES_DIR
+
+
+def is_packed_file(file_name):
+    """Return True for the files served from an archive: markdown pages and images"""
+    if file_name.endswith(".md"):
+        return True
+    mime_type, _ = mimetypes.guess_type(file_name)
+    return bool(mime_type and mime_type.startswith("image/"))
+
+
+def collect_files(extra=()):
+    """Return the root index, every page and image under the categories, and any extra paths"""
+    paths = []
+    if os.path.exists("index.md"):
+        paths.append("index.md")
+
+    for dir_path, dir_names, file_names in os.walk(CATEGORIES_DIR):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if is_packed_file(file_name):
+                paths.append(os.path.join(dir_path, file_name))
+
+    for path in extra:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                paths.extend(os.path.join(dir_path, name) for name in sorted(file_names) if is_packed_file(name))
+        else:
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the wiki's pages and images into one memory-mappable archive")
+    parser.add_argument("--output", default="wiki.pak", help="archive path (default: wiki.pak)")
+    parser.add_argument("--include", action="append", default=[], help="extra file or directory to pack (repeatable)")
+    parser.add_argument("--verify", metavar="ARCHIVE", help="check the hashes of an existing archive instead of packing")
+    args = parser.parse_args(argv)
+
+    from personal_wiki.app.utils.archive import WikiArchive, write_archive
+
+    if args.verify:
+        archive = WikiArchive(args.verify)
+        corrupt = archive.verify()
+        for path in corrupt:
+            print(f"Hash mismatch: {path}")
+        print(f"Checked {len(archive)} files, {len(corrupt)} corrupt")
+        return 1 if corrupt else 0
+
+    # Pack from the filesystem even if WIKI_ARCHIVE is set
+    if os.environ.get("WIKI_ARCHIVE"):
+        parser.error("unset WIKI_ARCHIVE before packing")
+
+    start = time.perf_counter()
+    count = write_archive(args.output, collect_files(args.include), get_md_files())
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.output)
+    print(f"Packed {count} files ({size / 1024 / 1024:.1f} MiB) in {elapsed:.2f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import argparse
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from personal_wiki.app.utils.file import get_md_files, iter_md_files, get_file_stats, read_md_file
+
+# Bump when the page layout changes so every page is rebuilt
+BUILDER_VERSION = 2
+
+MANIFEST_NAME = ".build-manifest.json"
+
+LINK_PATTERN = re.compile(r'href="\?file=([^"]+)"')
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{root}static.css">
+</head>
+<body>
+<nav><a href="{root}index.html">📚 Personal Wiki</a> &rsaquo; {breadcrumbs}</nav>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+STYLESHEET = """body { font-family: sans-serif; max-width: 60rem; margin: 0 auto; padding: 1rem; color: #31333F; }
+nav { font-size: 0.9em; margin-bottom: 1rem; }
+a { color: #0068c9; }
+a.broken-link { color: #c62828; text-decoration: line-through; }
+h1 { padding-bottom: 0.5rem; border-bottom: 2px solid #f0f2f6; }
+h2 { padding-bottom: 0.3rem; border-bottom: 1px solid #f0f2f6; margin-top: 1.5rem; }
+pre { background: #f0f2f6; border-radius: 5px; padding: 0.75rem; overflow-x: auto; }
+img { max-width: 100%; height: auto; }
+table { width: 100%; border-collapse: collapse; }
+th, td { border: 1px solid #f0f2f6; padding: 8px; text-align: left; }
+tr:nth-child(even) { background-color: #f0f2f6; }
+"""
+
+# Set once per worker process by init_worker
+_known_pages = frozenset()
+_output_dir = ""
+_gzip_output = True
+
+
+def output_path_for(file_path):
+    """Return the output path of a page, relative to the output directory"""
+    return os.path.splitext(os.path.normpath(file_path))[0] + ".html"
+
+
+def init_worker(known_pages, output_dir, gzip_output):
+    """Share the page set and output settings with a worker process"""
+    global _known_pages, _output_dir, _gzip_output
+    _known_pages = known_pages
+    _output_dir = output_dir
+    _gzip_output = gzip_output
+
+
+def segments_to_html(segments):
+    """Join rendered segments into one HTML body"""
+    from personal_wiki.app.utils.highlight import highlight_code, plain_code_html
+
+    parts = []
+    for segment in segments:
+        if segment[0] == "code":
+            _, lang, code = segment
+            parts.append(highlight_code(code, lang) or plain_code_html(code, lang))
+        else:
+            parts.append(segment[1])
+    return "\n".join(parts)
+
+
+def rewrite_links(body, page_output):
+    """Point ?file= links at static pages; return (body, linked page paths)"""
+    page_dir = os.path.dirname(page_output)
+    targets = []
+
+    def replace(match):
+        target = html.unescape(match.group(1))
+        targets.append(target)
+        href = os.path.relpath(output_path_for(target), page_dir or ".")
+        if target not in _known_pages:
+            return f'class="broken-link" href="{html.escape(href)}"'
+        return f'href="{html.escape(href)}"'
+
+    return LINK_PATTERN.sub(replace, body), targets
+
+
+def copy_assets(body, page_output):
+    """Copy referenced asset-store images next to the site and point at the copies"""
+    from personal_wiki.app.utils.assets import ASSET_DIR, ASSET_URL_PREFIX
+
+    prefix = f'src="{ASSET_URL_PREFIX}/'
+    if prefix not in body:
+        return body
+
+    page_dir = os.path.dirname(page_output)
+
+    def replace(match):
+        name = match.group(1)
+        target = os.path.join(_output_dir, "assets", name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(os.path.join(ASSET_DIR, name), target)
+        return f'src="{os.path.relpath(os.path.join("assets", name), page_dir or ".")}"'
+
+    return re.sub(re.escape(prefix) + r'([^"/]+)"', replace, body)
+
+
+def build_page(file_path):
+    """Render one page to HTML (plus .gz); return (file_path, linked page paths)"""
+    from personal_wiki.app.utils.markdown import extract_title
+    from personal_wiki.app.utils.render import render_segments
+
+    md_content = read_md_file(file_path)
+    page_output = output_path_for(file_path)
+
+    body = segments_to_html(render_segments(md_content, file_path))
+    body, targets = rewrite_links(body, page_output)
+    body = copy_assets(body, page_output)
+
+    depth = page_output.count(os.sep)
+    breadcrumbs = " &rsaquo; ".join(html.escape(part) for part in os.path.normpath(file_path).split(os.sep))
+    page = PAGE_TEMPLATE.format(
+        title=html.escape(extract_title(md_content)),
+        root="../" * depth,
+        breadcrumbs=breadcrumbs,
+        body=body,
+    ).encode("utf-8")
+
+    write_output(os.path.join(_output_dir, page_output), page, _gzip_output)
+    return file_path, sorted(set(targets))
+
+
+def write_output(path, data, gzip_output):
+    """Atomically write a file and, optionally, a precompressed .gz copy"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    outputs = [(path, data)]
+    if gzip_output:
+        # mtime=0 keeps the compressed bytes reproducible
+        outputs.append((f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0)))
+
+    for target, payload in outputs:
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+
+
+def source_hash(file_path):
+    """Return the SHA-256 of a source file"""
+    from personal_wiki.app.utils.archive import get_archive
+
+    archive = get_archive()
+    if archive is not None and file_path in archive:
+        return archive.sha256(file_path)
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    """Load the build manifest, or an empty one if missing or from another builder version"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": BUILDER_VERSION, "pages": {}}
+    if manifest.get("version") != BUILDER_VERSION:
+        return {"version": BUILDER_VERSION, "pages": {}}
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    """Atomically write the build manifest"""
+    tmp_path = os.path.join(output_dir, f"{MANIFEST_NAME}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+
+
+def plan_build(pages, stats, manifest, output_dir, force=False):
+    """Return the pages that need rendering and their current source hashes
+
+    A page is rebuilt when its source changed, its output is missing, or
+    one of the pages it links to appeared or disappeared (which changes
+    whether the link is rendered as broken).
+    """
+    previous = manifest["pages"]
+    hashes = {}
+    for file_path in pages:
+        entry = previous.get(file_path)
+        if entry and entry.get("stat") == list(stats[file_path]):
+            hashes[file_path] = entry["hash"]
+        else:
+            hashes[file_path] = source_hash(file_path)
+
+    known = set(pages)
+    to_build = []
+    for file_path in pages:
+        entry = previous.get(file_path)
+        if (
+            force
+            or entry is None
+            or entry["hash"] != hashes[file_path]
+            or not os.path.exists(os.path.join(output_dir, output_path_for(file_path)))
+            or any((target in known) != entry["links"].get(target, False) for target in entry["links"])
+        ):
+            to_build.append(file_path)
+    return to_build, hashes
+
+
+def build_site(output_dir, jobs=None, force=False, gzip_output=True):
+    """Render every wiki page to static HTML, rebuilding only what changed"""
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    pages = []
+    for file_path, _ in iter_md_files(get_md_files()):
+        if file_path not in pages:
+            pages.append(file_path)
+    if os.path.exists("index.md"):
+        pages.insert(0, "index.md")
+
+    stats = get_file_stats(pages)
+    pages = [file_path for file_path in pages if file_path in stats]
+
+    manifest = load_manifest(output_dir)
+    to_build, hashes = plan_build(pages, stats, manifest, output_dir, force)
+    known = frozenset(pages)
+
+    results = {}
+    if to_build:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(known, output_dir, gzip_output)
+        ) as pool:
+            for file_path, targets in pool.map(build_page, to_build, chunksize=16):
+                results[file_path] = targets
+
+    # Remove outputs of pages that no longer exist
+    removed = [file_path for file_path in manifest["pages"] if file_path not in known]
+    for file_path in removed:
+        for suffix in ("", ".gz"):
+            stale = os.path.join(output_dir, output_path_for(file_path) + suffix)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    new_pages = {}
+    for file_path in pages:
+        if file_path in results:
+            links = {target: target in known for target in results[file_path]}
+        else:
+            links = manifest["pages"][file_path]["links"]
+        new_pages[file_path] = {
+            "hash": hashes[file_path],
+            "stat": list(stats[file_path]),
+            "output": output_path_for(file_path),
+            "links": links,
+        }
+
+    write_output(os.path.join(output_dir, "static.css"), STYLESHEET.encode("utf-8"), gzip_output)
+    save_manifest(output_dir, {"version": BUILDER_VERSION, "pages": new_pages})
+    return {"built": len(to_build), "skipped": len(pages) - len(to_build), "removed": len(removed)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prebuild the wiki as a static HTML site")
+    parser.add_argument("--output", default="site", help="output directory (default: site)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild every page")
+    parser.add_argument("--no-gzip", action="store_true", help="skip precompressed .gz copies")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = build_site(args.output, jobs=args.jobs, force=args.force, gzip_output=not args.no_gzip)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Built {summary['built']} pages, skipped {summary['skipped']} unchanged, "
+        f"removed {summary['removed']} in {elapsed:.2f}s -> {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
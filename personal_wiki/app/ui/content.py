@@ -1,10 +1,21 @@
 import streamlit as st
 import os
 import datetime
-import re
-from pathlib import Path
-from personal_wiki.app.utils.markdown import md_to_html, process_images, process_links, clean_code_blocks, extract_title
-from personal_wiki.app.utils.file import read_md_file
+import html
+from personal_wiki.app.utils.markdown import extract_title
+from personal_wiki.app.utils.file import read_md_file, read_md_prefix, is_large_file, path_exists, file_stat
+from personal_wiki.app.utils.render import get_rendered_segments
+from personal_wiki.app.utils.link_graph import get_link_graph_nowait, link_graph_service
+from personal_wiki.app.utils.catalog import get_catalog_nowait
+from personal_wiki.app.utils.highlight import highlight_code
+from personal_wiki.app.utils.sections import (
+    PREVIEW_KB,
+    is_large,
+    get_sections,
+    get_section_segments,
+    get_preview_segments,
+    source_page,
+)
 
 def handle_file_selection():
     """Handle file selection via URL parameters or defaults"""
@@ -12,10 +23,10 @@ def handle_file_selection():
     query_params = st.experimental_get_query_params()
     file_param = query_params.get("file")
 
-    if file_param and os.path.exists(file_param[0]):
+    if file_param and path_exists(file_param[0]):
         st.session_state.selected_file = file_param[0]
     # Default to index.md if no file is selected
-    elif not hasattr(st.session_state, "selected_file") or not os.path.exists(
+    elif not hasattr(st.session_state, "selected_file") or not path_exists(
         st.session_state.selected_file
     ):
         st.session_state.selected_file = "index.md"
@@ -24,14 +35,14 @@ def handle_file_selection():
             st.experimental_set_query_params(file="index.md")
 
     # Check if the selected file exists
-    if not os.path.exists(st.session_state.selected_file):
+    if not path_exists(st.session_state.selected_file):
         st.error(f"File not found: {st.session_state.selected_file}")
         st.session_state.selected_file = "index.md"
         st.experimental_set_query_params(file="index.md")
 
     return st.session_state.selected_file
 
-def create_breadcrumbs(selected_file_path):
+def create_breadcrumbs(selected_file_path, title=None):
     """Create breadcrumb navigation for the current file"""
     try:
         # Try to make a relative path if possible
@@ -50,100 +61,195 @@ def create_breadcrumbs(selected_file_path):
         breadcrumb_parts = selected_file_path.split(os.sep)
         breadcrumb_parts = [p for p in breadcrumb_parts if p]
 
+    # The last crumb shows the page title rather than its file name
+    if breadcrumb_parts and title:
+        breadcrumb_parts[-1] = title
+
     if len(breadcrumb_parts) > 0:
         breadcrumb_html = " > ".join(
-            [f'<span style="color: #0068c9">{part}</span>' for part in breadcrumb_parts]
+            [f'<span style="color: #0068c9">{html.escape(part)}</span>' for part in breadcrumb_parts]
         )
         st.markdown(f"<p><small>{breadcrumb_html}</small></p>", unsafe_allow_html=True)
 
-def display_content_tabs(md_content, selected_file_path):
-    """Display content in tabs (rendered and source)"""
-    tab1, tab2 = st.tabs(["Rendered View", "Source"])
-    
-    with tab1:
-        # Extract and store code blocks
-        code_blocks = []
-        content_parts = []
-        
-        # Match fenced code blocks with language specifier
-        pattern = r"```([a-zA-Z0-9_+-]*)\n(.*?)```"
-        
-        # Process the markdown content
-        last_end = 0
-        for match in re.finditer(pattern, md_content, re.DOTALL):
-            # Add text before this code block
-            if match.start() > last_end:
-                content_parts.append(md_content[last_end:match.start()])
-                
-            # Add a placeholder for the code block
-            lang = match.group(1).strip()
-            code = match.group(2)
-            code_blocks.append((lang, code))
-            content_parts.append(f"CODE_BLOCK_{len(code_blocks) - 1}")
-            
-            last_end = match.end()
-        
-        # Add any remaining content
-        if last_end < len(md_content):
-            content_parts.append(md_content[last_end:])
-            
-        # Join all non-code parts
-        processed_md = "".join(content_parts)
-        
-        # Convert to HTML and process links/images
-        html_content = md_to_html(processed_md)
-        html_content = process_images(html_content, selected_file_path)
-        html_content = process_links(html_content, selected_file_path)
-        
-        # Split by code block placeholders
-        html_parts = html_content.split("CODE_BLOCK_")
-        
-        # Display first part
-        if html_parts[0].strip():
-            st.markdown(html_parts[0], unsafe_allow_html=True)
-            
-        # Display each code block followed by subsequent content
-        for i, part in enumerate(html_parts[1:], 0):
-            # Find the block number
-            block_num = i
-            
-            # Display the code block using Streamlit's code element
-            lang, code = code_blocks[block_num]
-            st.code(code, language=lang if lang else None)
-            
-            # Find where the actual content starts
-            content_start = part.find(">") + 1 if ">" in part else 0
-            
-            # Display the rest of this section if any
-            if part[content_start:].strip():
-                st.markdown(part[content_start:], unsafe_allow_html=True)
-    
-    with tab2:
-        # Display the raw markdown
-        st.code(md_content, language="markdown")
+def display_segments(segments):
+    """Display rendered segments, highlighting code blocks"""
+    for segment in segments:
+        if segment[0] == "code":
+            # Highlighted HTML is cached by (language, code hash, theme)
+            _, lang, code = segment
+            highlighted = highlight_code(code, lang, st.session_state.get("theme_selector", "Light"))
+            if highlighted is not None:
+                st.markdown(highlighted, unsafe_allow_html=True)
+            else:
+                st.code(code, language=lang if lang else None)
+        else:
+            st.markdown(segment[1], unsafe_allow_html=True)
+
+def display_content_tabs(md_content, selected_file_path, truncated=False):
+    """Display the rendered or source view of a page
+
+    Only the selected view is built (unlike st.tabs, which builds both).
+    A truncated page is rendered as a preview, never into the page caches.
+    """
+    view = st.radio(
+        "View",
+        ["Rendered View", "Source"],
+        horizontal=True,
+        key="content_view",
+        label_visibility="collapsed",
+    )
+
+    if view == "Source":
+        display_source(md_content, selected_file_path)
+    elif truncated:
+        display_segments(get_preview_segments(selected_file_path, md_content))
+    elif is_large(md_content):
+        display_sections(md_content, selected_file_path)
+    else:
+        # Rendered segments are cached per (path, mtime, size)
+        display_segments(get_rendered_segments(selected_file_path, md_content))
+
+def display_sections(md_content, selected_file_path):
+    """Render a large page section by section, only rendering the sections opened"""
+    sections = get_sections(selected_file_path, md_content)
+    state_key = f"open_sections_{selected_file_path}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {sections[0]["start"]}
+    open_sections = st.session_state[state_key]
+
+    st.info(f"Large page: {len(sections)} sections, rendered on demand.")
+    if st.button("Expand all sections", key="expand_all_sections"):
+        open_sections.update(section["start"] for section in sections)
+
+    for section in sections:
+        if section["start"] in open_sections:
+            display_segments(get_section_segments(selected_file_path, md_content, section))
+        elif st.button(
+            f"{'#' * section['level']} {section['title'] or 'Introduction'}",
+            key=f"section_{section['start']}",
+            use_container_width=True,
+        ):
+            open_sections.add(section["start"])
+            st.rerun()
+
+def display_source(md_content, selected_file_path):
+    """Display the raw markdown one page of lines at a time"""
+    page_key = f"source_page_{selected_file_path}"
+    page = st.session_state.get(page_key, 0)
+    text, page_count = source_page(md_content, page)
+    page = min(page, page_count - 1)
 
-def display_file_metadata(selected_file_path):
+    if page_count > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Previous", key="source_prev", disabled=page == 0):
+                st.session_state[page_key] = page - 1
+                st.rerun()
+        with col2:
+            st.markdown(f"<small>Lines page {page + 1} of {page_count}</small>", unsafe_allow_html=True)
+        with col3:
+            if st.button("Next ▶", key="source_next", disabled=page >= page_count - 1):
+                st.session_state[page_key] = page + 1
+                st.rerun()
+
+    st.code(text, language="markdown")
+
+def display_load_more(selected_file_path, loaded_bytes):
+    """Offer to load more of a truncated page, or all of it"""
+    size = file_stat(selected_file_path)[1]
+    st.info(f"Showing the first {loaded_bytes // 1024:,} KB of {size // 1024:,} KB.")
+    preview_key = f"preview_bytes_{selected_file_path}"
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Load more", key="preview_more", use_container_width=True):
+            st.session_state[preview_key] = loaded_bytes * 2
+            st.rerun()
+    with col2:
+        if st.button("Load full page", key="preview_full", use_container_width=True):
+            st.session_state[preview_key] = None
+            st.rerun()
+
+def display_file_metadata(selected_file_path, page=None):
     """Display file metadata like last updated time"""
-    mod_time = os.path.getmtime(selected_file_path)
+    # Catalogued pages need no stat call
+    mod_time = page["mtime"] if page else file_stat(selected_file_path)[0]
+    details = f"Last updated: {datetime.datetime.fromtimestamp(mod_time).strftime('%Y-%m-%d %H:%M')}"
+    if page:
+        details += f" · {page['word_count']} words"
     st.markdown(
-        f"<p><small>Last updated: {datetime.datetime.fromtimestamp(mod_time).strftime('%Y-%m-%d %H:%M')}</small></p>",
+        f"<p><small>{details}</small></p>",
         unsafe_allow_html=True,
     )
 
-def display_content(selected_file_path):
+def page_link(file_path, title):
+    """Return an in-app HTML link to a wiki page"""
+    return f'<a href="?file={html.escape(file_path)}" target="_self">{html.escape(title)}</a>'
+
+def display_link_panel(selected_file_path, md_files):
+    """Display backlinks and broken links from the precomputed link graph"""
+    graph = get_link_graph_nowait(md_files)
+    if graph is None:
+        st.markdown("<div class='sidebar-note'>Backlinks appear once the link graph is built</div>", unsafe_allow_html=True)
+        return
+    with link_graph_service.read():
+        linked_from = graph.linked_from(selected_file_path)
+        broken = graph.broken_links(selected_file_path)
+        titles = {path: graph.title(path) for path in linked_from}
+
+    with st.expander(f"🔗 Linked from {len(linked_from)} pages", expanded=False):
+        if linked_from:
+            items = "".join(f"<li>{page_link(path, titles[path])}</li>" for path in linked_from)
+            st.markdown(f"<ul>{items}</ul>", unsafe_allow_html=True)
+        else:
+            st.markdown("<div class='sidebar-note'>No pages link here</div>", unsafe_allow_html=True)
+
+        if broken:
+            st.warning(f"{len(broken)} broken link(s) on this page")
+            st.markdown("\n".join(f"- `{target}`" for _, target in broken))
+
+        # The wiki-wide report is only built on request
+        if st.checkbox("Show broken-link report for the whole wiki", key="broken_link_report"):
+            with link_graph_service.read():
+                report = graph.broken_links()
+            if report:
+                st.table([
+                    {"page": source, "missing target": target} for source, target in report
+                ])
+            else:
+                st.success("No broken links")
+
+def display_content(selected_file_path, md_files=None):
     """Display the main content area with the selected markdown file"""
+    # Large files start as a preview of their first PREVIEW_KB; the rest loads on demand
+    preview_bytes = None
+    if is_large_file(selected_file_path):
+        preview_bytes = st.session_state.get(f"preview_bytes_{selected_file_path}", int(PREVIEW_KB * 1024))
+
     # Read and process the selected file
-    md_content = read_md_file(selected_file_path)
+    if preview_bytes is None:
+        md_content, truncated = read_md_file(selected_file_path), False
+    else:
+        md_content, truncated = read_md_prefix(selected_file_path, preview_bytes)
     
+    # Catalogued pages already know their title and metadata (once the catalog is built)
+    catalog = get_catalog_nowait(md_files) if md_files is not None else None
+    page = catalog.get(selected_file_path) if catalog is not None else None
+
     # Extract and display the title
-    title = extract_title(md_content)
+    title = page["title"] if page else extract_title(md_content)
     st.title(title)
     
     # Create breadcrumbs
-    create_breadcrumbs(selected_file_path)
+    create_breadcrumbs(selected_file_path, title)
     
     # Display file metadata
-    display_file_metadata(selected_file_path)
+    display_file_metadata(selected_file_path, page)
     
     # Display content tabs
-    display_content_tabs(md_content, selected_file_path)
\ No newline at end of file
+    display_content_tabs(md_content, selected_file_path, truncated)
+    if truncated:
+        display_load_more(selected_file_path, preview_bytes)
+
+    # Display backlinks and broken links
+    if md_files is not None:
+        display_link_panel(selected_file_path, md_files)
\ No newline at end of file
@@ -1,179 +1,247 @@
+import json
+import hashlib
 import streamlit as st
 
+# Theme colours are CSS custom properties set on :root (see ui.theme), so
+# switching themes only updates the variables, never the stylesheet. The
+# rules only apply once a theme was picked (data-wiki-theme is set), so the
+# theme from config.toml shows until then. Elsewhere the variables fall
+# back to the colours used before any theme is picked
+THEME_CSS = """
+:root[data-wiki-theme] .stApp {
+    background-color: var(--wiki-bg);
+    color: var(--wiki-text);
+    font-family: var(--wiki-font);
+}
+:root[data-wiki-theme] .stApp .stMarkdown,
+:root[data-wiki-theme] .stApp .stMarkdown p,
+:root[data-wiki-theme] .stApp h1,
+:root[data-wiki-theme] .stApp h2,
+:root[data-wiki-theme] .stApp h3 {
+    color: var(--wiki-text);
+}
+:root[data-wiki-theme] [data-testid="stSidebar"] {
+    background-color: var(--wiki-secondary-bg);
+}
+:root[data-wiki-theme] .stApp a {
+    color: var(--wiki-primary);
+}
+:root[data-wiki-theme] .stApp button[kind="primary"] {
+    background-color: var(--wiki-primary);
+    border-color: var(--wiki-primary);
+}
+"""
+
+MAIN_CSS = """
+.main {
+    padding: 0rem 1rem;
+}
+.stMarkdown h1 {
+    padding-bottom: 0.5rem;
+    border-bottom: 2px solid var(--wiki-secondary-bg, #f0f2f6);
+}
+.stMarkdown h2 {
+    padding-bottom: 0.3rem;
+    border-bottom: 1px solid var(--wiki-secondary-bg, #f0f2f6);
+    margin-top: 1.5rem;
+}
+.stMarkdown pre {
+    border-radius: 5px;
+}
+.stMarkdown img {
+    max-width: 100%;
+    height: auto;
+}
+.stMarkdown table {
+    width: 100%;
+    border-collapse: collapse;
+}
+.stMarkdown th, .stMarkdown td {
+    border: 1px solid var(--wiki-secondary-bg, #f0f2f6);
+    padding: 8px;
+    text-align: left;
+}
+.stMarkdown tr:nth-child(even) {
+    background-color: var(--wiki-secondary-bg, #f0f2f6);
+}
+.stTabs [data-baseweb="tab-list"] {
+    gap: 8px;
+}
+.stTabs [data-baseweb="tab"] {
+    height: auto;
+    white-space: pre-wrap;
+    background-color: var(--wiki-secondary-bg, #f0f2f6);
+    border-radius: 4px;
+    padding: 0.5rem 1rem;
+}
+.stTabs [aria-selected="true"] {
+    background-color: rgba(151, 166, 195, 0.25) !important;
+    border-bottom: 3px solid var(--wiki-primary, #0068c9) !important;
+}
+"""
+
+SIDEBAR_CSS = """
+/* Sidebar header styling */
+.css-1lcbmhc.e1fqkh3o0, .css-1aehpvj.e1fqkh3o0 {
+    padding-top: 1rem !important;
+    padding-bottom: 0.5rem !important;
+}
+
+/* Button styling */
+.nav-button {
+    display: flex;
+    align-items: center;
+    padding: 8px 12px;
+    margin: 4px 0;
+    border-radius: 6px;
+    cursor: pointer;
+    transition: background-color 0.3s ease;
+}
+
+.nav-button:hover {
+    background-color: rgba(151, 166, 195, 0.15);
+}
+
+.nav-icon {
+    margin-right: 8px;
+    font-size: 1.2em;
+}
+
+.nav-label {
+    flex-grow: 1;
+}
+
+/* Home button specific styling */
+.home-button {
+    background-color: rgba(151, 166, 195, 0.1);
+    margin-bottom: 12px;
+}
+
+/* Active category styling */
+.active-category {
+    border-left: 3px solid var(--wiki-primary, #0068c9);
+    padding-left: 9px !important;
+    background-color: rgba(0, 104, 201, 0.1);
+}
+
+/* Category item styling */
+.category-item {
+    transition: all 0.2s ease;
+    border-left: 3px solid transparent;
+    padding-left: 12px;
+}
+
+/* File item styling */
+.file-item {
+    padding-left: 24px;
+    margin: 4px 0;
+    display: block;
+    color: #444;
+    text-decoration: none;
+    transition: all 0.2s ease;
+    border-radius: 4px;
+    padding: 6px 12px 6px 24px;
+}
+
+.file-item:hover {
+    background-color: rgba(151, 166, 195, 0.15);
+    padding-left: 26px;
+}
+
+.active-file {
+    background-color: rgba(0, 104, 201, 0.1);
+    font-weight: 500;
+}
+
+/* Subcategory styling */
+.subcategory-label {
+    margin-left: 15px;
+    margin-top: 10px;
+    font-weight: 500;
+    display: flex;
+    align-items: center;
+}
+
+/* Footer styling */
+.sidebar-footer {
+    text-align: center;
+    color: #888;
+    font-size: 0.8em;
+    padding: 10px 0;
+}
+
+/* Mobile responsiveness */
+.mobile-notice {
+    display: none;
+    text-align: center;
+    padding: 10px;
+    background-color: var(--wiki-secondary-bg, #f0f2f6);
+    border-radius: 4px;
+    margin-top: 20px;
+}
+
+.sidebar-note {
+    font-size: 0.85em;
+    color: #888;
+    font-style: italic;
+}
+
+/* Responsive design for mobile */
+@media (max-width: 768px) {
+    .mobile-notice {
+        display: block;
+    }
+
+    .nav-button, .file-item {
+        padding: 10px 12px; /* Larger touch targets for mobile */
+    }
+
+    [data-testid="stSidebar"] {
+        min-width: 250px !important;
+    }
+}
+"""
+
+CSS_BUNDLE = THEME_CSS + MAIN_CSS + SIDEBAR_CSS
+
+# Content hash of the bundle; a changed bundle replaces the injected one
+CSS_BUNDLE_HASH = hashlib.sha256(CSS_BUNDLE.encode("utf-8")).hexdigest()[:12]
+
+def run_in_parent(script):
+    """Run a script against the app page from a zero-height component
+
+    Whatever the script adds to the parent document outlives the component,
+    so it only needs to run once per session.
+    """
+    import streamlit.components.v1 as components
+
+    components.html(
+        f"<script>const doc = window.parent.document;\n{script}</script>",
+        height=0,
+    )
+
+def inject_css():
+    """Add the CSS bundle to the page head once per session"""
+    if st.session_state.get("css_bundle_hash") == CSS_BUNDLE_HASH:
+        return
+    st.session_state.css_bundle_hash = CSS_BUNDLE_HASH
+
+    style_id = f"wiki-css-{CSS_BUNDLE_HASH}"
+    run_in_parent(f"""
+if (!doc.getElementById({json.dumps(style_id)})) {{
+    doc.querySelectorAll("style[data-wiki-css]").forEach((old) => old.remove());
+    const style = doc.createElement("style");
+    style.id = {json.dumps(style_id)};
+    style.dataset.wikiCss = "1";
+    style.textContent = {json.dumps(CSS_BUNDLE)};
+    doc.head.appendChild(style);
+}}
+""")
+
 def local_css():
-    """Apply custom CSS for the main content area"""
-    st.markdown("""
-    <style>
-        .main {
-            padding: 0rem 1rem;
-        }
-        .stMarkdown h1 {
-            padding-bottom: 0.5rem;
-            border-bottom: 2px solid #f0f2f6;
-        }
-        .stMarkdown h2 {
-            padding-bottom: 0.3rem;
-            border-bottom: 1px solid #f0f2f6;
-            margin-top: 1.5rem;
-        }
-        .stMarkdown pre {
-            border-radius: 5px;
-        }
-        .stMarkdown img {
-            max-width: 100%;
-            height: auto;
-        }
-        .stMarkdown table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        .stMarkdown th, .stMarkdown td {
-            border: 1px solid #f0f2f6;
-            padding: 8px;
-            text-align: left;
-        }
-        .stMarkdown tr:nth-child(even) {
-            background-color: #f0f2f6;
-        }
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 8px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            height: auto;
-            white-space: pre-wrap;
-            background-color: #f0f2f6;
-            border-radius: 4px;
-            padding: 0.5rem 1rem;
-        }
-        .stTabs [aria-selected="true"] {
-            background-color: #e0e2e6 !important;
-            border-bottom: 3px solid #0068c9 !important;
-        }
-    </style>
-    """, unsafe_allow_html=True)
+    """Apply custom CSS for the main content area (injected once per session)"""
+    inject_css()
 
 def apply_sidebar_css():
-    """Apply custom CSS for sidebar enhancements"""
-    st.markdown("""
-    <style>
-        /* Sidebar header styling */
-        .css-1lcbmhc.e1fqkh3o0, .css-1aehpvj.e1fqkh3o0 {
-            padding-top: 1rem !important;
-            padding-bottom: 0.5rem !important;
-        }
-        
-        /* Button styling */
-        .nav-button {
-            display: flex;
-            align-items: center;
-            padding: 8px 12px;
-            margin: 4px 0;
-            border-radius: 6px;
-            cursor: pointer;
-            transition: background-color 0.3s ease;
-        }
-        
-        .nav-button:hover {
-            background-color: rgba(151, 166, 195, 0.15);
-        }
-        
-        .nav-icon {
-            margin-right: 8px;
-            font-size: 1.2em;
-        }
-        
-        .nav-label {
-            flex-grow: 1;
-        }
-        
-        /* Home button specific styling */
-        .home-button {
-            background-color: rgba(151, 166, 195, 0.1);
-            margin-bottom: 12px;
-        }
-        
-        /* Active category styling */
-        .active-category {
-            border-left: 3px solid #0068c9;
-            padding-left: 9px !important;
-            background-color: rgba(0, 104, 201, 0.1);
-        }
-        
-        /* Category item styling */
-        .category-item {
-            transition: all 0.2s ease;
-            border-left: 3px solid transparent;
-            padding-left: 12px;
-        }
-        
-        /* File item styling */
-        .file-item {
-            padding-left: 24px;
-            margin: 4px 0;
-            display: block;
-            color: #444;
-            text-decoration: none;
-            transition: all 0.2s ease;
-            border-radius: 4px;
-            padding: 6px 12px 6px 24px;
-        }
-        
-        .file-item:hover {
-            background-color: rgba(151, 166, 195, 0.15);
-            padding-left: 26px;
-        }
-        
-        .active-file {
-            background-color: rgba(0, 104, 201, 0.1);
-            font-weight: 500;
-        }
-        
-        /* Subcategory styling */
-        .subcategory-label {
-            margin-left: 15px;
-            margin-top: 10px;
-            font-weight: 500;
-            display: flex;
-            align-items: center;
-        }
-        
-        /* Footer styling */
-        .sidebar-footer {
-            text-align: center;
-            color: #888;
-            font-size: 0.8em;
-            padding: 10px 0;
-        }
-        
-        /* Mobile responsiveness */
-        .mobile-notice {
-            display: none;
-            text-align: center;
-            padding: 10px;
-            background-color: #f0f2f6;
-            border-radius: 4px;
-            margin-top: 20px;
-        }
-        
-        .sidebar-note {
-            font-size: 0.85em;
-            color: #888;
-            font-style: italic;
-        }
-        
-        /* Responsive design for mobile */
-        @media (max-width: 768px) {
-            .mobile-notice {
-                display: block;
-            }
-            
-            .nav-button, .file-item {
-                padding: 10px 12px; /* Larger touch targets for mobile */
-            }
-            
-            [data-testid="stSidebar"] {
-                min-width: 250px !important;
-            }
-        }
-    </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """Apply custom CSS for sidebar enhancements (part of the same bundle)"""
+    inject_css()
@@ -0,0 +1,48 @@
+import os
+import streamlit as st
+from personal_wiki.app.utils import metrics
+
+
+def debug_enabled():
+    """Return True when the debug panel is requested via WIKI_DEBUG=1 or ?debug=1"""
+    if os.environ.get("WIKI_DEBUG", "") == "1":
+        return True
+    return st.experimental_get_query_params().get("debug", [""])[0] == "1"
+
+
+def show_debug_panel(timings):
+    """Display per-stage timings for this rerun and the process-wide metrics"""
+    data = metrics.snapshot()
+
+    with st.sidebar.expander("🛠 Debug metrics", expanded=False):
+        st.markdown("**This rerun**")
+        st.table(
+            [{"stage": name, "ms": round(seconds * 1000, 2)} for name, seconds in timings.items()]
+        )
+
+        st.markdown("**Counters**")
+        st.table([{"counter": name, "value": value} for name, value in sorted(data["counters"].items())])
+
+        st.markdown("**Stage totals**")
+        st.table(
+            [
+                {
+                    "stage": name,
+                    "count": timer["count"],
+                    "avg ms": round(timer["sum"] / timer["count"] * 1000, 2),
+                    "max ms": round(timer["max"] * 1000, 2),
+                }
+                for name, timer in sorted(data["timers"].items())
+            ]
+        )
+
+        for name, fields in sorted(data["gauges"].items()):
+            st.markdown(f"**{name}**")
+            st.json(fields)
+
+        st.download_button(
+            "Download Prometheus metrics",
+            metrics.render_prometheus(data),
+            file_name="wiki_metrics.prom",
+            mime="text/plain",
+        )
@@ -1,8 +1,7 @@
 import streamlit as st
-from personal_wiki.app.utils.file import get_md_files
-from personal_wiki.app.utils.markdown import md_to_html, process_images, process_links
+from personal_wiki.app.utils.markdown import md_to_html
 import os
-import re
+import time
 
 def create_sidebar_navigation(md_files):
     """Create the sidebar navigation from the wiki structure with enhanced design"""
@@ -23,19 +22,30 @@ def create_sidebar_navigation(md_files):
     # Add theme selector to the sidebar
     from personal_wiki.app.ui.theme import show_theme_selector
     show_theme_selector()
+
+    # Opt-in background rendering of the pages the current page links to
+    from personal_wiki.app.utils.prefetch import PREFETCH
+    st.sidebar.checkbox("⚡ Prefetch linked pages", value=PREFETCH, key="prefetch_links")
     
     # Search box for filtering content
+    # Page titles come from the catalog, so no page is read to label a button;
+    # until its first build finishes, buttons are labelled from file names
+    from personal_wiki.app.utils.catalog import get_catalog_nowait
+    catalog = get_catalog_nowait(md_files)
+    titles = catalog.titles() if catalog is not None else {}
+
     search_term = st.sidebar.text_input("🔍 Search wiki", key="search_wiki")
     if search_term:
-        from personal_wiki.app.utils.search import search_wiki_content
-        search_results = search_wiki_content(search_term, md_files)
-        if search_results:
-            st.sidebar.markdown("### Search Results")
-            for result in search_results:
-                if st.sidebar.button(f"📝 {result['title']}", key=f"search_{result['path']}"):
-                    st.session_state.selected_file = result['path']
-                    st.experimental_set_query_params(file=result['path'])
-                    st.rerun()
+        from personal_wiki.app.utils.search import SEARCH_MODES
+        search_mode = st.sidebar.radio(
+            "Search mode",
+            SEARCH_MODES,
+            format_func=str.capitalize,
+            horizontal=True,
+            key="search_mode",
+            label_visibility="collapsed",
+        )
+        render_search_results(search_term, search_mode, md_files, titles)
     
     # Home/index button
     if st.sidebar.button("📄 Home", key="home_button", use_container_width=True):
@@ -43,23 +53,154 @@ def create_sidebar_navigation(md_files):
         st.experimental_set_query_params(file="index.md")
         st.rerun()
     
+    # Quick-jump selector covering every page with a single widget
+    render_quick_jump(md_files, titles)
+
     # Categories in sidebar with active state highlighting
     current_file = st.session_state.get("selected_file", "")
     from personal_wiki.app.utils.file import get_category_from_path
     current_category = get_category_from_path(current_file)
-    
+
+    # Only the open category builds widgets for its pages; navigating
+    # elsewhere re-opens the sections and list pages that hold the new page
+    if st.session_state.get("sidebar_active_file") != current_file:
+        st.session_state.sidebar_active_file = current_file
+        st.session_state.sidebar_open_category = current_category
+        for key in [k for k in st.session_state if str(k).startswith(("sidebar_open_sub_", "sidebar_page_"))]:
+            del st.session_state[key]
+
     for category_name, category_data in md_files.items():
         is_active = category_name == current_category
-        render_category_section(category_name, category_data, is_active)
+        render_category_section(category_name, category_data, is_active, titles)
+
+
+# Number of page buttons shown per page of a file list
+SIDEBAR_PAGE_SIZE = int(os.environ.get("WIKI_SIDEBAR_PAGE_SIZE", "20"))
+
+
+def render_search_results(search_term, search_mode, md_files, titles):
+    """Render one page of search results, reusing the session's recent result sets"""
+    from personal_wiki.app.utils.search_session import QuerySession, SEARCH_PAGE_SIZE
+
+    if "search_session" not in st.session_state:
+        st.session_state.search_session = QuerySession()
+    session = st.session_state.search_session
+
+    # Let fast typing settle; a keystroke during the wait stops this run
+    # at the next widget call, before the stale query is searched
+    delay = session.debounce(search_term, search_mode)
+    if delay:
+        time.sleep(delay)
+
+    results_container = st.sidebar.container()
+    results_container.markdown("### Search Results")
+    results = session.search(search_term, md_files, search_mode)
+
+    # A new query starts on its first page
+    if st.session_state.get("search_results_query") != (search_term, search_mode):
+        st.session_state.search_results_query = (search_term, search_mode)
+        st.session_state.search_results_page = 0
+    page = st.session_state.search_results_page
+
+    # Only the visible page gets buttons and snippets
+    rows, has_more, total = results.page(page, SEARCH_PAGE_SIZE)
+    for result in rows:
+        title = titles.get(result['path'], result['title'])
+        if results_container.button(f"📝 {title}", key=f"search_{result['path']}"):
+            navigate_to(result['path'])
+        if result['snippet']:
+            results_container.caption(result['snippet'])
+
+    if not rows:
+        results_container.markdown(
+            "<div class='sidebar-note'>No matching pages</div>",
+            unsafe_allow_html=True,
+        )
+    elif page > 0 or has_more:
+        col1, col2, col3 = results_container.columns([1, 2, 1])
+        with col1:
+            if st.button("◀", key="search_prev", disabled=page == 0):
+                st.session_state.search_results_page = page - 1
+                st.rerun()
+        with col2:
+            count = f" of {total}" if total is not None else ""
+            st.markdown(
+                f"<div class='sidebar-note'>Results {page * SEARCH_PAGE_SIZE + 1}–"
+                f"{page * SEARCH_PAGE_SIZE + len(rows)}{count}</div>",
+                unsafe_allow_html=True,
+            )
+        with col3:
+            if st.button("▶", key="search_next", disabled=not has_more):
+                st.session_state.search_results_page = page + 1
+                st.rerun()
+
+
+def navigate_to(file_path):
+    """Select a file, update the URL and rerun"""
+    st.session_state.selected_file = file_path
+    st.experimental_set_query_params(file=file_path)
+    st.rerun()
+
+
+def render_quick_jump(md_files, titles=None):
+    """Render a searchable selectbox that jumps straight to any page"""
+    from personal_wiki.app.utils.file import iter_md_files
+
+    titles = titles or {}
+    options = [""]
+    labels = {}
+    for file_path, title in iter_md_files(md_files):
+        if file_path not in labels:
+            options.append(file_path)
+            labels[file_path] = titles.get(file_path) or title or page_display_name(file_path)
+
+    def on_jump():
+        target = st.session_state.get("quick_jump")
+        if target:
+            st.session_state.selected_file = target
+            st.experimental_set_query_params(file=target)
+            st.session_state.quick_jump = ""
 
+    st.sidebar.selectbox(
+        "⚡ Jump to page",
+        options,
+        format_func=lambda path: labels.get(path, "Select a page..."),
+        key="quick_jump",
+        on_change=on_jump,
+    )
 
-def render_category_section(category_name, category_data, is_active=False):
+
+def page_display_name(file_path):
+    """Build a display name from a file path"""
+    return os.path.basename(file_path).replace(".md", "").replace("-", " ").title()
+
+
+def toggle_section(state_key, name):
+    """Open the named section, or close it if it is already open"""
+    if st.session_state.get(state_key) == name:
+        st.session_state[state_key] = None
+    else:
+        st.session_state[state_key] = name
+
+
+def render_category_section(category_name, category_data, is_active=False, titles=None):
     """Render a category section in the sidebar with enhanced styling"""
     category_title = category_name.capitalize()
-    active_class = "active-category" if is_active else "category-item"
+    is_open = st.session_state.get("sidebar_open_category") == category_name
+
+    # Collapsed categories cost a single button
+    st.sidebar.button(
+        f"{'📂' if is_open else '📁'} {category_title}",
+        key=f"cat_toggle_{category_name}",
+        use_container_width=True,
+        type="primary" if is_active else "secondary",
+        on_click=toggle_section,
+        args=("sidebar_open_category", category_name),
+    )
+    if not is_open:
+        return
 
-    # Category expander with active state highlighting
-    with st.sidebar.expander(f"📁 {category_title}", expanded=is_active):
+    with st.sidebar.container():
         # Category main page button
         if st.button(
             f"📄 Overview",
@@ -67,13 +208,11 @@ def render_category_section(category_name, category_data, is_active=False):
             help=f"View {category_title} overview",
             use_container_width=True,
         ):
-            st.session_state.selected_file = category_data["path"]
-            st.experimental_set_query_params(file=category_data["path"])
-            st.rerun()
+            navigate_to(category_data["path"])
 
         # Files directly in the category
         if "files" in category_data and category_data["files"]:
-            render_file_list(category_name, category_data["files"])
+            render_file_list(category_name, category_data["files"], titles)
         else:
             st.markdown(
                 "<div class='sidebar-note'>No files in this category</div>",
@@ -82,88 +221,134 @@ def render_category_section(category_name, category_data, is_active=False):
 
         # Subcategories if they exist
         if "subcategories" in category_data and category_data["subcategories"]:
-            render_subcategories(category_name, category_data["subcategories"])
+            render_subcategories(category_name, category_data["subcategories"], titles)
+
+
+def render_paginated(list_key, items):
+    """Return the slice of (name, path) items on the current page, with pager controls"""
+    if len(items) <= SIDEBAR_PAGE_SIZE:
+        return items
+
+    page_count = (len(items) + SIDEBAR_PAGE_SIZE - 1) // SIDEBAR_PAGE_SIZE
+    page_key = f"sidebar_page_{list_key}"
+
+    # Start on the page holding the active file; navigating clears page_key
+    if page_key not in st.session_state:
+        current_file = st.session_state.get("selected_file", "")
+        paths = [path for _, path in items]
+        position = paths.index(current_file) if current_file in paths else 0
+        st.session_state[page_key] = position // SIDEBAR_PAGE_SIZE
+
+    page = min(st.session_state[page_key], page_count - 1)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀", key=f"prev_{list_key}", disabled=page == 0):
+            st.session_state[page_key] = page - 1
+            st.rerun()
+    with col2:
+        st.markdown(
+            f"<div class='sidebar-note'>Page {page + 1} of {page_count}</div>",
+            unsafe_allow_html=True,
+        )
+    with col3:
+        if st.button("▶", key=f"next_{list_key}", disabled=page >= page_count - 1):
+            st.session_state[page_key] = page + 1
+            st.rerun()
+
+    start = page * SIDEBAR_PAGE_SIZE
+    return items[start:start + SIDEBAR_PAGE_SIZE]
 
 
-def render_file_list(category_name, files):
+def render_file_list(category_name, files, titles=None):
     """Render a list of files with enhanced styling"""
+    titles = titles or {}
     # Get current file to highlight active item
     current_file = st.session_state.get("selected_file", "")
 
-    for file_name, file_path in files.items():
+    for file_name, file_path in render_paginated(category_name, list(files.items())):
         # Check if this file is the active one
         is_active = file_path == current_file
-        active_class = "active-file" if is_active else ""
-        title_display = file_name.replace("-", " ").title()
+        title_display = titles.get(file_path) or file_name.replace("-", " ").title()
         
         # Use a button instead of JavaScript onclick
         if st.button(f"📝 {title_display}", 
                   key=f"file_{category_name}_{file_name}", 
                   use_container_width=True,
                   type="secondary" if is_active else "primary"):
-            st.session_state.selected_file = file_path
-            st.experimental_set_query_params(file=file_path)
-            st.rerun()
+            navigate_to(file_path)
+
 
+def subtree_contains(subcategory_data, file_path):
+    """Return True if a subcategory or any subcategory below it holds file_path"""
+    if subcategory_data.get("index") == file_path or file_path in subcategory_data.get("files", {}).values():
+        return True
+    return any(subtree_contains(sub, file_path) for sub in subcategory_data.get("subcategories", {}).values())
 
-def render_subcategories(category_name, subcategories):
+
+def render_subcategories(category_name, subcategories, titles=None):
     """Render subcategories within a category with enhanced styling"""
     st.markdown("#### Subcategories")
+    current_file = st.session_state.get("selected_file", "")
 
     for subcategory_name, subcategory_data in subcategories.items():
         subcat_display = subcategory_name.replace("-", " ").title()
+        subcat_key = f"{category_name}/{subcategory_name}"
 
-        # Display subcategory as a section with proper formatting
-        st.markdown(
-            f"""
-            <div class="subcategory-label">
-                <span>📁 {subcat_display}</span>
-            </div>
-            """,
-            unsafe_allow_html=True,
+        # Subcategories holding the active file, at any depth, start open
+        state_key = f"sidebar_open_sub_{category_name}"
+        if state_key not in st.session_state and current_file and subtree_contains(subcategory_data, current_file):
+            st.session_state[state_key] = subcategory_name
+        is_open = st.session_state.get(state_key) == subcategory_name
+
+        st.button(
+            f"{'📂' if is_open else '📁'} {subcat_display}",
+            key=f"subcat_toggle_{subcat_key}",
+            use_container_width=True,
+            on_click=toggle_section,
+            args=(state_key, subcategory_name),
         )
+        if not is_open:
+            continue
 
         # Subcategory index if it exists
         if "index" in subcategory_data:
             if st.button(f"📄 {subcat_display} Index", 
                       key=f"subcat_idx_{category_name}_{subcategory_name}",
                       use_container_width=True):
-                st.session_state.selected_file = subcategory_data["index"]
-                st.experimental_set_query_params(file=subcategory_data["index"])
-                st.rerun()
+                navigate_to(subcategory_data["index"])
 
         # Files in the subcategory
-        render_subcategory_files(category_name, subcategory_name, subcategory_data)
+        render_subcategory_files(category_name, subcategory_name, subcategory_data, titles)
+
+        # Deeper subcategories, if the tree has them
+        if subcategory_data.get("subcategories"):
+            render_subcategories(subcat_key, subcategory_data["subcategories"], titles)
 
 
-def render_subcategory_files(category_name, subcategory_name, subcategory_data):
+def render_subcategory_files(category_name, subcategory_name, subcategory_data, titles=None):
     """Render files within a subcategory with enhanced styling"""
+    titles = titles or {}
     current_file = st.session_state.get("selected_file", "")
+    files = list(subcategory_data.get("files", {}).items())
 
-    for subfile_name, subfile_path in subcategory_data.get("files", {}).items():
+    for subfile_name, subfile_path in render_paginated(f"{category_name}/{subcategory_name}", files):
         # Check if this file is the active one
         is_active = subfile_path == current_file
-        active_class = "active-file" if is_active else ""
-        subtitle_display = subfile_name.replace("-", " ").title()
+        subtitle_display = titles.get(subfile_path) or subfile_name.replace("-", " ").title()
         
         # Use Streamlit buttons for better compatibility
         if st.button(f"📝 {subtitle_display}", 
                   key=f"subfile_{category_name}_{subcategory_name}_{subfile_name}",
                   use_container_width=True,
                   type="secondary" if is_active else "primary"):
-            st.session_state.selected_file = subfile_path
-            st.experimental_set_query_params(file=subfile_path)
-            st.rerun()
+            navigate_to(subfile_path)
 
 
 def handle_markdown_display(md_content, selected_file_path):
     """Process and display markdown content with proper code block handling"""
-    # Convert to HTML first
-    html_content = md_to_html(md_content)
-    
-    # Process images and links
-    html_content = process_images(html_content, selected_file_path)
-    html_content = process_links(html_content, selected_file_path)
+    # Convert to HTML, rewriting images and links in the same pass
+    html_content = md_to_html(md_content, selected_file_path)
     
     # Final rendering
     st.markdown(html_content, unsafe_allow_html=True)
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-import toml
 import os
 
 # Available themes
@@ -45,6 +44,9 @@ def save_theme_config(theme_name):
     """Save selected theme to config.toml"""
     if theme_name not in THEMES:
         return False
+
+    # Only needed when a theme is saved, so not imported at startup
+    import toml
     
     # Make sure .streamlit directory exists
     streamlit_dir = os.path.join(os.path.expanduser("~"), ".streamlit")
@@ -69,29 +71,74 @@ def save_theme_config(theme_name):
     
     return True
 
+# Font stacks for the "font" setting of a theme
+FONT_FAMILIES = {
+    "sans serif": '"Source Sans Pro", sans-serif',
+    "serif": '"Source Serif Pro", serif',
+    "monospace": '"Source Code Pro", monospace',
+}
+
+def configured_theme():
+    """Return the name of the theme config.toml sets, or None if it sets none of THEMES"""
+    primary = (st.get_option("theme.primaryColor") or "").lower()
+    background = (st.get_option("theme.backgroundColor") or "").lower()
+    for name, theme in THEMES.items():
+        if theme["primaryColor"].lower() == primary and theme["backgroundColor"].lower() == background:
+            return name
+    return None
+
+def theme_css_variables(theme_name):
+    """Return the CSS custom properties for a theme"""
+    theme = THEMES[theme_name]
+    return {
+        "--wiki-primary": theme["primaryColor"],
+        "--wiki-bg": theme["backgroundColor"],
+        "--wiki-secondary-bg": theme["secondaryBackgroundColor"],
+        "--wiki-text": theme["textColor"],
+        "--wiki-font": FONT_FAMILIES.get(theme["font"], theme["font"]),
+    }
+
+def apply_theme(theme_name):
+    """Switch the page to a theme by updating its CSS custom properties
+
+    Runs only when the theme differs from the one already applied in this
+    session; no config is written and the page is not reloaded.
+    """
+    if st.session_state.get("applied_theme") == theme_name:
+        return
+    st.session_state.applied_theme = theme_name
+
+    import json
+    from personal_wiki.app.ui.css import run_in_parent
+
+    run_in_parent(f"""
+const vars = {json.dumps(theme_css_variables(theme_name))};
+for (const [name, value] of Object.entries(vars)) {{
+    doc.documentElement.style.setProperty(name, value);
+}}
+doc.documentElement.dataset.wikiTheme = {json.dumps(theme_name)};
+""")
+
 def show_theme_selector():
     """Display theme selector in sidebar"""
     with st.sidebar.expander("🎨 Theme Settings", expanded=False):
         theme_options = list(THEMES.keys())
-        
-        # Default to Light theme
+
+        # Start from the configured theme, which Streamlit already shows,
+        # so no theme CSS is applied until another one is picked
+        default_theme = configured_theme() or theme_options[0]
+        st.session_state.setdefault("applied_theme", default_theme)
         selected_theme = st.selectbox(
             "Select theme:",
             theme_options,
-            index=0,
+            index=theme_options.index(default_theme),
             key="theme_selector"
         )
+
+        # Applied straight away through CSS variables
+        apply_theme(selected_theme)
         
-        if st.button("Apply Theme", key="apply_theme"):
-            save_theme_config(selected_theme)
-            st.success(f"Theme updated to {selected_theme}! Refresh to see changes.")
-            st.markdown(
-                """
-                <script>
-                    setTimeout(function() {
-                        window.location.reload();
-                    }, 1500);
-                </script>
-                """, 
-                unsafe_allow_html=True
-            )
\ No newline at end of file
+        # Persisting the theme for new sessions is an explicit action
+        if st.button("Save as default", key="save_default_theme"):
+            if save_theme_config(selected_theme):
+                st.success(f"{selected_theme} saved as the default theme for new sessions.")
@@ -0,0 +1,148 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import threading
+
+# Serve pages and images from this packed archive instead of the filesystem
+ARCHIVE_PATH = os.environ.get("WIKI_ARCHIVE", "")
+
+# Layout: MAGIC, header (index offset, index length), file blobs, JSON index
+MAGIC = b"WIKIPAK1"
+HEADER = struct.Struct("<QQ")
+ARCHIVE_VERSION = 1
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+class WikiArchive:
+    """Read-only view of a packed wiki archive through a single memory map
+
+    The index maps each normalised relative path to (offset, length,
+    mtime, sha256); "tree" holds the get_md_files structure at pack time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Ask for the whole file up front: one sequential read instead of many small ones
+        if hasattr(self.mm, "madvise"):
+            for advice in ("MADV_SEQUENTIAL", "MADV_WILLNEED"):
+                if hasattr(mmap, advice):
+                    self.mm.madvise(getattr(mmap, advice))
+
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a wiki archive")
+        index_offset, index_length = HEADER.unpack_from(self.mm, len(MAGIC))
+        index = json.loads(self.mm[index_offset:index_offset + index_length].decode("utf-8"))
+        if index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"{path} has unsupported archive version {index.get('version')}")
+
+        self.files = index["files"]
+        self.tree = index["tree"]
+
+    def __contains__(self, path):
+        return os.path.normpath(path) in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def stat(self, path):
+        """Return (mtime, size) of an archived file, or raise FileNotFoundError"""
+        entry = self.files.get(os.path.normpath(path))
+        if entry is None:
+            raise FileNotFoundError(path)
+        return entry[2], entry[1]
+
+    def read_bytes(self, path):
+        """Return the contents of an archived file, or raise FileNotFoundError"""
+        entry = self.files.get(os.path.normpath(path))
+        if entry is None:
+            raise FileNotFoundError(path)
+        offset, length = entry[0], entry[1]
+        return self.mm[offset:offset + length]
+
+    def mm_slice(self, path, start, length):
+        """Return up to length bytes of an archived file from start"""
+        entry = self.files.get(os.path.normpath(path))
+        if entry is None:
+            raise FileNotFoundError(path)
+        start = min(start, entry[1])
+        end = min(start + length, entry[1])
+        return self.mm[entry[0] + start:entry[0] + end]
+
+    def sha256(self, path):
+        entry = self.files.get(os.path.normpath(path))
+        return entry[3] if entry else None
+
+    def verify(self):
+        """Return the paths whose contents no longer match their recorded hash"""
+        return [
+            path for path, entry in sorted(self.files.items())
+            if hashlib.sha256(self.mm[entry[0]:entry[0] + entry[1]]).hexdigest() != entry[3]
+        ]
+
+
+def write_archive(output_path, paths, tree):
+    """Pack the given files and md_files tree into an archive; return the number of files"""
+    files = {}
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(MAGIC)
+        out.write(HEADER.pack(0, 0))
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            files[os.path.normpath(path)] = [
+                out.tell(), len(data), os.stat(path).st_mtime, hashlib.sha256(data).hexdigest()
+            ]
+            out.write(data)
+
+        index = json.dumps({"version": ARCHIVE_VERSION, "tree": tree, "files": files}).encode("utf-8")
+        index_offset = out.tell()
+        out.write(index)
+        out.seek(len(MAGIC))
+        out.write(HEADER.pack(index_offset, len(index)))
+    os.replace(tmp_path, output_path)
+    return len(files)
+
+
+def get_archive():
+    """Return the archive named by WIKI_ARCHIVE (opened once), or None in filesystem mode"""
+    global _archive
+    if not ARCHIVE_PATH:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = WikiArchive(ARCHIVE_PATH)
+        return _archive
+
+
+def file_stat(path):
+    """Return (mtime, size) of a wiki file from the archive or the filesystem"""
+    archive = get_archive()
+    if archive is not None and path in archive:
+        return archive.stat(path)
+    st = os.stat(path)
+    return st.st_mtime, st.st_size
+
+
+def path_exists(path):
+    """Return True if a wiki file exists in the archive or on the filesystem"""
+    archive = get_archive()
+    if archive is not None and path in archive:
+        return True
+    return os.path.exists(path)
+
+
+def read_file_bytes(path):
+    """Return the bytes of a wiki file from the archive or the filesystem"""
+    archive = get_archive()
+    if archive is not None and path in archive:
+        return archive.read_bytes(path)
+    with open(path, "rb") as f:
+        return f.read()
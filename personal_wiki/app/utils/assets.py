@@ -0,0 +1,125 @@
+import os
+import base64
+import hashlib
+import mimetypes
+import tempfile
+import threading
+from pathlib import Path
+from personal_wiki.app.utils.archive import file_stat, read_file_bytes
+
+# Streamlit serves this directory at app/static when server.enableStaticServing is on
+STATIC_DIR = os.environ.get(
+    "WIKI_STATIC_DIR", str(Path(__file__).resolve().parents[3] / "static")
+)
+ASSET_DIR = os.path.join(STATIC_DIR, "assets")
+ASSET_URL_PREFIX = os.environ.get("WIKI_ASSET_URL_PREFIX", "app/static/assets")
+
+# "url" serves images from the asset store, "inline" embeds them as data URIs
+ASSET_MODE = os.environ.get("WIKI_ASSET_MODE", "url")
+
+# Images wider than this get a downscaled variant (0 disables, needs Pillow)
+MAX_IMAGE_WIDTH = int(os.environ.get("WIKI_IMAGE_MAX_WIDTH", "0"))
+
+# Streamlit's static handler only sends a real Content-Type for these
+URL_SAFE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+
+# Resolved URLs keyed by (path, mtime, size) so unchanged images are hashed once
+_asset_urls = {}
+_asset_lock = threading.Lock()
+
+
+def image_mime_type(img_path):
+    """Guess the MIME type of an image from its extension"""
+    mime_type, _ = mimetypes.guess_type(img_path)
+    return mime_type or "application/octet-stream"
+
+
+def image_data_uri(img_path):
+    """Encode an image file as a data URI with the correct MIME type"""
+    encoded = base64.b64encode(read_file_bytes(img_path)).decode()
+    return f"data:{image_mime_type(img_path)};base64,{encoded}"
+
+
+def resolve_image(img_path):
+    """Return a src for a local image, or None if the file does not exist"""
+    try:
+        mtime, size = file_stat(img_path)
+    except OSError:
+        return None
+
+    ext = os.path.splitext(img_path)[1].lower()
+    if ASSET_MODE != "url" or ext not in URL_SAFE_EXTENSIONS:
+        return image_data_uri(img_path)
+
+    key = (img_path, mtime, size)
+    with _asset_lock:
+        url = _asset_urls.get(key)
+    if url is None:
+        url = f"{ASSET_URL_PREFIX}/{store_image(img_path)}"
+        with _asset_lock:
+            _asset_urls[key] = url
+    return url
+
+
+def store_image(img_path):
+    """Copy an image into the content-addressed store and return its asset name"""
+    data = read_file_bytes(img_path)
+
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(img_path)[1].lower()
+    name = f"{digest}{ext}"
+    target = os.path.join(ASSET_DIR, name)
+
+    if not os.path.exists(target):
+        _write_atomic(target, lambda f: f.write(data))
+
+    if MAX_IMAGE_WIDTH and pil_image() is not None:
+        return downscaled_variant(target, digest, ext) or name
+    return name
+
+
+def pil_image():
+    """Return PIL.Image, imported on first use, or None without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:  # Pillow is optional; without it images are never downscaled
+        return None
+    return Image
+
+
+def downscaled_variant(source, digest, ext):
+    """Create (once) a variant no wider than MAX_IMAGE_WIDTH; return its name or None"""
+    name = f"{digest}-w{MAX_IMAGE_WIDTH}{ext}"
+    target = os.path.join(ASSET_DIR, name)
+    if os.path.exists(target):
+        return name
+
+    Image = pil_image()
+    try:
+        with Image.open(source) as img:
+            # Animated images would lose their frames when resized
+            if img.width <= MAX_IMAGE_WIDTH or getattr(img, "is_animated", False):
+                return None
+            height = max(1, round(img.height * MAX_IMAGE_WIDTH / img.width))
+            resized = img.resize((MAX_IMAGE_WIDTH, height), Image.LANCZOS)
+            _write_atomic(target, lambda f: resized.save(f, format=img.format))
+    except (OSError, ValueError) as e:
+        print(f"Error creating image variant for {source}: {e}")
+        return None
+    return name
+
+
+def _write_atomic(target, write):
+    """Write target through write(f) on a temp file, then move it into place"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=os.path.splitext(target)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates the file owner-only; stored assets are served to everyone
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
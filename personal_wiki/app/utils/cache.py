@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Roughly estimate the memory held by a cached value in bytes"""
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by an approximate memory budget in bytes"""
+
+    def __init__(self, max_bytes, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the cached value and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to fit the budget"""
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            # Values larger than the whole budget are never cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            self._evict()
+
+    def resize(self, max_bytes):
+        """Change the memory budget, evicting entries if it shrank"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
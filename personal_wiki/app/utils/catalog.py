@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+from personal_wiki.app.utils.file import CACHE_DIR
+from personal_wiki.app.utils.indexing import refresh_index, page_title
+from personal_wiki.app.utils.service import SharedIndex
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional; simple "key: value" front matter is parsed without it
+    yaml = None
+
+CATALOG_PATH = os.path.join(CACHE_DIR, "catalog.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    headings TEXT NOT NULL,
+    word_count INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    front_matter TEXT NOT NULL
+)
+"""
+
+FRONT_MATTER_PATTERN = re.compile(r"\A---\s*\n(.*?)\n---\s*(?:\n|\Z)", re.DOTALL)
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+FENCE_PATTERN = re.compile(r"```.*?```", re.DOTALL)
+
+
+def parse_front_matter(content):
+    """Return (front matter dict, content without it) for a leading --- block"""
+    match = FRONT_MATTER_PATTERN.match(content)
+    if not match:
+        return {}, content
+
+    block = match.group(1)
+    fields = None
+    if yaml is not None:
+        try:
+            fields = yaml.safe_load(block)
+        except yaml.YAMLError:
+            fields = None
+    if not isinstance(fields, dict):
+        fields = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition(":")
+            if sep and key.strip():
+                fields[key.strip()] = value.strip().strip("\"'")
+
+    # Keep values JSON-serialisable (YAML may produce dates and the like)
+    fields = json.loads(json.dumps(fields, default=str))
+    return fields, content[match.end():]
+
+
+def extract_headings(content):
+    """Return [(level, text)] for the ATX headings outside fenced code"""
+    content = FENCE_PATTERN.sub("", content)
+    return [(len(hashes), text) for hashes, text in HEADING_PATTERN.findall(content)]
+
+
+def describe_page(path, content, stat):
+    """Build the catalog row for a page"""
+    return describe_page_chunks(path, [content], stat)
+
+
+def describe_page_chunks(path, chunks, stat):
+    """Build the catalog row for a page given as line-aligned text chunks
+
+    Front matter and the title come from the first chunk; headings, the
+    word count and the hash are accumulated over all of them.
+    """
+    digest = hashlib.sha256()
+    front_matter, title = None, None
+    headings = []
+    word_count = 0
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8"))
+        if front_matter is None:
+            front_matter, chunk = parse_front_matter(chunk)
+            title = front_matter.get("title") or page_title(chunk, path)
+        headings.extend(extract_headings(chunk))
+        word_count += len(chunk.split())
+
+    if front_matter is None:
+        front_matter, title = {}, page_title("", path)
+    return {
+        "path": path,
+        "title": str(title),
+        "headings": headings,
+        "word_count": word_count,
+        "mtime": stat[0],
+        "size": stat[1],
+        "sha256": digest.hexdigest(),
+        "front_matter": front_matter,
+    }
+
+
+class Catalog:
+    """SQLite-backed page catalog with an in-memory copy for per-rerun lookups
+
+    Implements the file_stats/add_document/remove_document interface so
+    refresh_index can keep it up to date incrementally.
+    """
+
+    def __init__(self, db_path=CATALOG_PATH):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+        self.rows = {}
+        for row in self.db.execute(
+            "SELECT path, title, headings, word_count, mtime, size, sha256, front_matter FROM pages"
+        ):
+            self.rows[row[0]] = {
+                "path": row[0],
+                "title": row[1],
+                "headings": [tuple(h) for h in json.loads(row[2])],
+                "word_count": row[3],
+                "mtime": row[4],
+                "size": row[5],
+                "sha256": row[6],
+                "front_matter": json.loads(row[7]),
+            }
+        self._titles = self._collect_titles()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def file_stats(self):
+        """Return {path: (mtime, size)} for every catalogued page"""
+        return {path: (row["mtime"], row["size"]) for path, row in self.rows.items()}
+
+    def add_document(self, path, content, title, stat):
+        """Insert or update a page (the catalog derives its own title from the content)"""
+        self.add_document_chunks(path, [content], title, stat)
+
+    def add_document_chunks(self, path, chunks, title, stat):
+        """Insert or update a page given as line-aligned text chunks"""
+        row = describe_page_chunks(path, chunks, stat)
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                row["path"],
+                row["title"],
+                json.dumps(row["headings"]),
+                row["word_count"],
+                row["mtime"],
+                row["size"],
+                row["sha256"],
+                json.dumps(row["front_matter"]),
+            ),
+        )
+        self.rows[path] = row
+
+    def remove_document(self, path):
+        """Drop a page from the catalog"""
+        self.db.execute("DELETE FROM pages WHERE path = ?", (path,))
+        self.rows.pop(path, None)
+
+    def commit(self):
+        self.db.commit()
+        # Swapped in whole, so sessions reading titles() never see a half-updated dict
+        self._titles = self._collect_titles()
+
+    def _collect_titles(self):
+        return {path: row["title"] for path, row in self.rows.items()}
+
+    def get(self, path):
+        """Return the catalog row for a page, or None"""
+        return self.rows.get(path)
+
+    def title(self, path, default=None):
+        """Return the catalogued title of a page"""
+        row = self.rows.get(path)
+        return row["title"] if row else default
+
+    def titles(self):
+        """Return {path: title} for every page, as of the last refresh"""
+        return self._titles
+
+
+def refresh_catalog(catalog, md_files):
+    changed = refresh_index(catalog, md_files)
+    if changed:
+        catalog.commit()
+    return changed
+
+
+# Shared by every session; refreshed at most once per INDEX_REFRESH_SECONDS
+catalog_service = SharedIndex(Catalog, refresh_catalog)
+
+
+def get_catalog(md_files):
+    """Return the page catalog, refreshing pages whose mtime or size changed"""
+    return catalog_service.get(md_files)
+
+
+def get_catalog_nowait(md_files):
+    """Return the page catalog, or None while it is first built in the background"""
+    return catalog_service.get_nowait(md_files)
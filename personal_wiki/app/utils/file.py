@@ -1,204 +1,411 @@
 import os
-import glob
 import re
-import markdown
-import base64
-from bs4 import BeautifulSoup
-
-
-# Parse markdown to HTML with extended features
-def md_to_html(md_content):
-    # Use the fenced_code and codehilite extensions for better code block handling
-    html = markdown.markdown(
-        md_content, 
-        extensions=[
-            'markdown.extensions.tables',
-            'markdown.extensions.fenced_code',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.nl2br'  # Add this to handle line breaks
-        ]
-    )
-    return html
+import codecs
+import pickle
+import tempfile
+import threading
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.archive import get_archive, file_stat, path_exists, read_file_bytes  # noqa: F401
 
+# Conversion helpers live in utils.markdown; re-exported for older imports
+from personal_wiki.app.utils.markdown import (  # noqa: F401
+    md_to_html,
+    extract_title,
+    process_images,
+    process_links,
+    clean_code_blocks,
+)
 
-# Get all markdown files in the wiki with their paths
-def get_md_files():
-    """Get all markdown files in the wiki with their paths"""
-    md_files = {}
-    categories = get_main_categories()
+# Directory for persisted indexes and snapshots
+CACHE_DIR = os.environ.get("WIKI_CACHE_DIR", ".wiki_cache")
 
-    for category in categories:
-        category_name = os.path.basename(category).replace(".md", "")
-        md_files[category_name] = {
-            "path": category,
-            "files": get_category_files(category_name),
-        }
+# Root of the category tree, relative to the working directory
+CATEGORIES_DIR = os.environ.get("WIKI_CATEGORIES_DIR", "categories")
 
-        # Process subcategories
-        subcategories = get_subcategories(category_name)
-        md_files[category_name]["subcategories"] = process_subcategories(
-            category_name, subcategories
-        )
+# Files larger than this are read incrementally rather than in one piece, in kilobytes
+LARGE_FILE_KB = float(os.environ.get("WIKI_LARGE_FILE_KB", "1024"))
 
-    return md_files
+# Bytes read from the start of a large file to find its title, in kilobytes
+PREFIX_READ_KB = float(os.environ.get("WIKI_PREFIX_READ_KB", "64"))
+
+# Size of the chunks large files are processed in, in kilobytes
+CHUNK_KB = float(os.environ.get("WIKI_CHUNK_KB", "1024"))
 
+# Use a filesystem watcher instead of per-directory mtime checks when available
+WATCH_TREE = os.environ.get("WIKI_WATCH_TREE", "") == "1"
 
-def get_main_categories():
-    """Get all main category markdown files"""
-    return [f for f in glob.glob("categories/*.md") if not "index.md" in f]
+FENCE_LINE_PATTERN = re.compile(r"^[ \t]*```", re.MULTILINE)
 
+# Scanned trees and the md_files structures built from them, keyed by root
+_tree_cache = {}
+_md_files_cache = {}
+_tree_watchers = {}
+_tree_lock = threading.Lock()
 
-def get_category_files(category_name):
-    """Get all files directly in a category"""
-    files = {}
-    category_dir = os.path.join("categories", category_name)
 
-    if os.path.isdir(category_dir):
-        subfiles = glob.glob(f"{category_dir}/*.md")
-        for subfile in subfiles:
-            file_name = os.path.basename(subfile).replace(".md", "")
-            files[file_name] = subfile
+# Get all markdown files in the wiki with their paths
+def get_md_files(root=None):
+    """Get all markdown files in the wiki with their paths
+
+    Returns {category: {"path", "files", "subcategories"}} where each
+    subcategory holds an optional "index", its "files" and, for deeper
+    trees, its own nested "subcategories". The result is cached and only
+    rebuilt when a directory in the tree changed. With WIKI_ARCHIVE set,
+    the tree recorded in the archive is returned without touching the disk.
+    """
+    archive = get_archive()
+    if archive is not None and root in (None, CATEGORIES_DIR):
+        return archive.tree
+
+    root = root or CATEGORIES_DIR
+    # Sessions share the cached tree, so only one thread revalidates it at a time
+    with _tree_lock:
+        return _build_md_files(root)
+
+
+def _build_md_files(root):
+    tree = scan_wiki_tree(root)
+    if tree is None:
+        return {}
+
+    cached = _md_files_cache.get(root)
+    if cached is not None and cached[0] is tree:
+        return cached[1]
 
-    return files
+    md_files = {}
+    for file_name in tree.md_files:
+        # Category pages live next to their directories, e.g. categories/books.md
+        if "index.md" in file_name:
+            continue
+        category_name = file_name[:-3]
+        category_node = tree.subdirs.get(category_name)
 
+        md_files[category_name] = {
+            "path": os.path.join(root, file_name),
+            "files": _node_files(category_node, include_index=True),
+            "subcategories": _node_subcategories(category_node),
+        }
 
-def get_subcategories(category_name):
-    """Get all subcategories in a category"""
-    category_dir = os.path.join("categories", category_name)
-    if os.path.isdir(category_dir):
-        return [
-            d
-            for d in os.listdir(category_dir)
-            if os.path.isdir(os.path.join(category_dir, d))
-        ]
-    return []
+    _md_files_cache[root] = (tree, md_files)
+    return md_files
 
 
-def process_subcategories(category_name, subcategories):
-    """Process all subcategories and their files"""
+class _TreeNode:
+    """A scanned directory: its mtime, markdown file names and child directories"""
+
+    __slots__ = ("path", "mtime", "md_files", "subdirs")
+
+    def __init__(self, path, mtime, md_files, subdirs):
+        self.path = path
+        self.mtime = mtime
+        self.md_files = md_files
+        self.subdirs = subdirs
+
+
+class _TreeWatcher:
+    """Marks the cached tree dirty on filesystem events (requires watchdog)"""
+
+    def __init__(self, root):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                watcher.dirty = True
+
+        self.dirty = True
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.schedule(_Handler(), root, recursive=True)
+        self.observer.start()
+
+
+def scan_wiki_tree(root):
+    """Return the scanned tree under root, revalidating only changed directories
+
+    Each known directory costs one stat; only directories whose mtime
+    changed are listed again. With WIKI_WATCH_TREE=1 and watchdog
+    installed, an unchanged tree is returned without any syscalls.
+    """
+    watcher = _get_tree_watcher(root)
+    previous = _tree_cache.get(root)
+    if watcher is not None and previous is not None and not watcher.dirty:
+        return previous
+
+    if watcher is not None:
+        watcher.dirty = False
+
+    try:
+        tree = _scan_directory(root, previous)
+    except FileNotFoundError:
+        _tree_cache.pop(root, None)
+        return None
+
+    _tree_cache[root] = tree
+    return tree
+
+
+def _get_tree_watcher(root):
+    if not WATCH_TREE or not os.path.isdir(root):
+        return None
+    if root not in _tree_watchers:
+        try:
+            _tree_watchers[root] = _TreeWatcher(root)
+        except ImportError:
+            _tree_watchers[root] = None
+    return _tree_watchers[root]
+
+
+def _scan_directory(path, previous=None):
+    """Scan a directory with one os.scandir call, reusing the previous listing if unchanged"""
+    mtime = os.stat(path).st_mtime_ns
+
+    if previous is not None and previous.mtime == mtime:
+        md_files = previous.md_files
+        subdir_names = list(previous.subdirs)
+    else:
+        md_files = []
+        subdir_names = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    subdir_names.append(entry.name)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    md_files.append(entry.name)
+        md_files.sort()
+        metrics.incr("dirs_scanned")
+        metrics.incr("files_scanned", len(md_files))
+
+    # Subdirectories are revalidated even when this listing is unchanged
+    previous_subdirs = previous.subdirs if previous is not None else {}
+    subdirs = {}
+    changed = previous is None or previous.mtime != mtime
+    for name in sorted(subdir_names):
+        try:
+            child = _scan_directory(os.path.join(path, name), previous_subdirs.get(name))
+        except FileNotFoundError:
+            changed = True
+            continue
+        subdirs[name] = child
+        changed = changed or child is not previous_subdirs.get(name)
+
+    if not changed:
+        return previous
+    return _TreeNode(path, mtime, md_files, subdirs)
+
+
+def _node_files(node, include_index=False):
+    """Map file name (without .md) to path for the markdown files in a directory"""
+    if node is None:
+        return {}
+    return {
+        file_name[:-3]: os.path.join(node.path, file_name)
+        for file_name in node.md_files
+        if include_index or "index.md" not in file_name
+    }
+
+
+def _node_subcategories(node):
+    """Build the nested subcategory structure below a directory"""
     result = {}
+    if node is None:
+        return result
 
-    for subcategory in subcategories:
+    for subcategory, child in node.subdirs.items():
         result[subcategory] = {}
-        subcategory_path = os.path.join("categories", category_name, subcategory)
 
         # Get the index file for the subcategory
-        index_file = os.path.join(subcategory_path, "index.md")
-        if os.path.exists(index_file):
-            result[subcategory]["index"] = index_file
+        if "index.md" in child.md_files:
+            result[subcategory]["index"] = os.path.join(child.path, "index.md")
 
         # Get files in the subcategory
-        result[subcategory]["files"] = get_subcategory_files(subcategory_path)
+        result[subcategory]["files"] = _node_files(child)
+
+        # Deeper levels are only present when they exist
+        nested = _node_subcategories(child)
+        if nested:
+            result[subcategory]["subcategories"] = nested
 
     return result
 
 
-def get_subcategory_files(subcategory_path):
-    """Get all files in a subcategory"""
-    files = {}
+def iter_md_files(md_files):
+    """Yield (path, title) for every page in the wiki structure
+
+    The title is None unless the structure implies one (category and
+    subcategory index pages), in which case callers should prefer it.
+    """
+    for category_name, category_data in md_files.items():
+        yield category_data["path"], category_name.capitalize()
+
+        for file_name, file_path in category_data.get("files", {}).items():
+            yield file_path, None
 
-    subcat_files = [
-        f for f in glob.glob(f"{subcategory_path}/*.md") if not "index.md" in f
-    ]
+        yield from _iter_subcategory_files(category_data.get("subcategories", {}))
 
-    for subcat_file in subcat_files:
-        file_name = os.path.basename(subcat_file).replace(".md", "")
-        files[file_name] = subcat_file
 
-    return files
+def _iter_subcategory_files(subcategories):
+    for subcategory_name, subcategory_data in subcategories.items():
+        if "index" in subcategory_data:
+            yield subcategory_data["index"], f"{subcategory_name.capitalize()} Index"
 
+        for subfile_name, subfile_path in subcategory_data.get("files", {}).items():
+            yield subfile_path, None
 
-# Extract title from markdown content
-def extract_title(md_content):
-    match = re.search(r"^#\s+(.+)$", md_content, re.MULTILINE)
-    if match:
-        return match.group(1)
-    return "Untitled"
+        yield from _iter_subcategory_files(subcategory_data.get("subcategories", {}))
+
+
+def get_file_stats(paths):
+    """Return {path: (mtime, size)} for the given paths, skipping missing files"""
+    stats = {}
+    for path in paths:
+        try:
+            stats[path] = file_stat(path)
+        except OSError:
+            continue
+    return stats
+
+
+def diff_file_stats(known, current):
+    """Compare two {path: (mtime, size)} maps and return (changed, removed) paths"""
+    changed = [path for path, stat in current.items() if known.get(path) != stat]
+    removed = [path for path in known if path not in current]
+    return changed, removed
+
+
+def load_snapshot(name):
+    """Load a pickled snapshot from the cache directory, or None if unavailable"""
+    snapshot_path = os.path.join(CACHE_DIR, name)
+    try:
+        with open(snapshot_path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def save_snapshot(name, obj):
+    """Atomically persist a pickled snapshot into the cache directory"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(CACHE_DIR, name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text_atomic(path, text):
+    """Replace a text file in one step, so readers never see a partial write"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp creates the file owner-only; keep the permissions of the file being replaced
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o7777 if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 # Read markdown file content
 def read_md_file(file_path):
     """Read markdown file content"""
+    archive = get_archive()
+    if archive is not None and file_path in archive:
+        data = archive.read_bytes(file_path)
+        metrics.incr("bytes_read", len(data))
+        metrics.incr("files_read")
+        return data.decode("utf-8")
+
     with open(file_path, "r", encoding="utf-8") as file:
         content = file.read()
+        metrics.incr("bytes_read", os.fstat(file.fileno()).st_size)
+    metrics.incr("files_read")
     return content
 
 
-# Process image links to display them properly
-def process_images(html_content, base_path):
-    soup = BeautifulSoup(html_content, "html.parser")
-    for img in soup.find_all("img"):
-        src = img.get("src", "")
-        if src.startswith("./"):
-            img_path = os.path.join(os.path.dirname(base_path), src[2:])
-            if os.path.exists(img_path):
-                with open(img_path, "rb") as img_file:
-                    encoded = base64.b64encode(img_file.read()).decode()
-                    img["src"] = f"data:image/png;base64,{encoded}"
-    return str(soup)
-
-
-# Process internal links to make them work in the app
-def process_links(html_content, current_file):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Fix for code blocks - ensure they're properly displayed
-    for pre in soup.find_all('pre'):
-        # For each pre tag (which contains code blocks)
-        if pre.code:
-            # Get the text content directly without processing
-            code_text = pre.code.get_text()
-            # Create a new code element with the original text
-            new_code = soup.new_tag('code')
-            new_code.string = code_text
-            # Replace the old code with the new one
-            pre.code.replace_with(new_code)
-    
-    # Process links as before
-    for link in soup.find_all('a'):
-        href = link.get('href', '')
-        if href.startswith('./'):
-            # This is a relative link to another wiki file
-            target_path = os.path.normpath(os.path.join(os.path.dirname(current_file), href[2:]))
-            link['href'] = f"?file={target_path}"
-            link['target'] = "_self"  # Ensure the link stays within the app
-    
-    return str(soup)
-
-# Additional function to clean up code blocks before display
-def clean_code_blocks(html_content):
-    """Clean up code blocks to ensure proper display with special characters"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Find all code blocks
-    for pre in soup.find_all('pre'):
-        if pre.code:
-            # Get the raw code content
-            code_content = pre.code.get_text()
-            
-            # Create a new code element
-            new_code = soup.new_tag('code')
-            
-            # Escape HTML entities
-            from html import escape
-            escaped_content = escape(code_content)
-            
-            # Set the escaped content directly
-            new_code.append(BeautifulSoup(f"<![CDATA[{escaped_content}]]>", 'html.parser'))
-            
-            # Replace the old code element
-            pre.code.replace_with(new_code)
-    
-    return str(soup)
+def is_large_file(file_path):
+    """Return True if a file is above the LARGE_FILE_KB threshold"""
+    try:
+        return file_stat(file_path)[1] > LARGE_FILE_KB * 1024
+    except OSError:
+        return False
+
+
+def read_md_prefix(file_path, max_bytes=None):
+    """Read at most max_bytes from the start of a file; return (text, truncated)"""
+    max_bytes = int(max_bytes or PREFIX_READ_KB * 1024)
+    archive = get_archive()
+    if archive is not None and file_path in archive:
+        size = archive.stat(file_path)[1]
+        data = archive.mm_slice(file_path, 0, max_bytes)
+    else:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = f.read(max_bytes)
+    metrics.incr("bytes_read", len(data))
+    # A multi-byte character cut at the boundary is dropped
+    return data.decode("utf-8", "ignore"), size > len(data)
+
+
+def iter_md_chunks(file_path, chunk_bytes=None):
+    """Yield a file's text in chunks of about chunk_bytes that end on line boundaries"""
+    chunk_bytes = int(chunk_bytes or CHUNK_KB * 1024)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    archive = get_archive()
+
+    if archive is not None and file_path in archive:
+        size = archive.stat(file_path)[1]
+        blocks = (archive.mm_slice(file_path, start, chunk_bytes) for start in range(0, size, chunk_bytes))
+    else:
+        blocks = _iter_file_blocks(file_path, chunk_bytes)
+
+    pending = ""
+    for block in blocks:
+        metrics.incr("bytes_read", len(block))
+        text = pending + decoder.decode(block)
+        cut = text.rfind("\n") + 1
+        # Never cut inside a fenced code block: back up to its opening line
+        fences = list(FENCE_LINE_PATTERN.finditer(text, 0, cut))
+        if len(fences) % 2:
+            cut = fences[-1].start()
+        if cut:
+            pending = text[cut:]
+            yield text[:cut]
+        else:
+            pending = text
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+    metrics.incr("files_read")
+
+
+def _iter_file_blocks(file_path, chunk_bytes):
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_bytes), b""):
+            yield block
+
 
 def get_category_from_path(file_path):
     """Extract category name from file path"""
     if not file_path or file_path == "index.md":
         return ""
 
-    parts = file_path.split(os.sep)
-    if len(parts) > 1 and parts[0] == "categories":
-        if len(parts) > 2:
-            return parts[1]  # Return the category name
+    rel_path = os.path.relpath(file_path, CATEGORIES_DIR)
+    if rel_path.startswith(os.pardir):
+        return ""
+
+    parts = rel_path.split(os.sep)
+    if len(parts) > 1:
+        return parts[0]  # Return the category name
     return ""
\ No newline at end of file
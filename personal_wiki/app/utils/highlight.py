@@ -0,0 +1,179 @@
+import os
+import html
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.cache import LRUCache
+from personal_wiki.app.utils.file import (
+    read_md_file,
+    iter_md_chunks,
+    iter_md_files,
+    is_large_file,
+    write_text_atomic,
+    CACHE_DIR,
+)
+from personal_wiki.app.utils.service import register_cache
+
+# Memory budget for highlighted code blocks, in megabytes
+HIGHLIGHT_CACHE_MB = float(os.environ.get("WIKI_HIGHLIGHT_CACHE_MB", "16"))
+
+# Highlighted blocks are also kept on disk so they survive restarts and
+# can be produced ahead of time by prehighlight_wiki
+HIGHLIGHT_DIR = os.path.join(CACHE_DIR, "highlight")
+
+# Pre-highlight every code block in the background when the app starts
+PREHIGHLIGHT = os.environ.get("WIKI_PREHIGHLIGHT", "") == "1"
+
+# Pygments style used for each app theme
+THEME_STYLES = {
+    "Light": "default",
+    "Dark": "monokai",
+    "Forest": "friendly",
+    "Oceanic": "colorful",
+    "Vintage": "sas",
+}
+
+DEFAULT_THEME = "Light"
+
+# Highlighted HTML keyed by (language, code hash, theme)
+highlight_cache = LRUCache(int(HIGHLIGHT_CACHE_MB * 1024 * 1024))
+metrics.register_collector("highlight_cache", highlight_cache.stats)
+register_cache("highlight", highlight_cache, weight=1)
+
+_prehighlight_thread = None
+_prehighlight_lock = threading.Lock()
+
+
+def highlight_key(lang, code, theme):
+    """Return the cache key of a code block: (language, sha256 of the code, theme)"""
+    return (lang or "", hashlib.sha256(code.encode("utf-8")).hexdigest(), theme)
+
+
+def disk_path(key):
+    """Return the on-disk location of a highlighted block"""
+    lang, digest, theme = key
+    name = hashlib.sha256(f"{lang}\0{theme}\0{digest}".encode("utf-8")).hexdigest()
+    return os.path.join(HIGHLIGHT_DIR, name[:2], f"{name}.html")
+
+
+def render_highlighted(code, lang, theme):
+    """Highlight a code block with Pygments, or return None if it is not installed"""
+    try:
+        from pygments import highlight
+        from pygments.formatters import HtmlFormatter
+        from pygments.lexers import get_lexer_by_name, TextLexer
+        from pygments.util import ClassNotFound
+    except ImportError:
+        return None
+
+    try:
+        lexer = get_lexer_by_name(lang) if lang else TextLexer()
+    except ClassNotFound:
+        lexer = TextLexer()
+
+    # Inline styles keep the block self-contained for st.markdown and static pages
+    formatter = HtmlFormatter(noclasses=True, style=THEME_STYLES.get(theme, "default"))
+    metrics.incr("code_blocks_highlighted")
+    return highlight(code, lexer, formatter)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp file per write, so concurrent sessions never share one
+    write_text_atomic(path, data)
+
+
+def highlight_code(code, lang, theme=DEFAULT_THEME):
+    """Return highlighted HTML for a code block, or None if Pygments is unavailable"""
+    key = highlight_key(lang, code, theme)
+    cached = highlight_cache.get(key)
+    if cached is not None:
+        return cached
+
+    path = disk_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            highlighted = f.read()
+    except OSError:
+        highlighted = None
+
+    if highlighted is None:
+        with metrics.timed("highlight"):
+            highlighted = render_highlighted(code, lang, theme)
+        if highlighted is None:
+            return None
+        try:
+            _write_atomic(path, highlighted)
+        except OSError as e:
+            print(f"Error caching highlighted code: {e}")
+
+    highlight_cache.put(key, highlighted)
+    return highlighted
+
+
+def plain_code_html(code, lang):
+    """Return an unhighlighted <pre><code> block"""
+    css_class = f' class="language-{html.escape(lang)}"' if lang else ""
+    return f"<pre><code{css_class}>{html.escape(code)}</code></pre>"
+
+
+def _highlight_to_disk(block):
+    """Worker: highlight one block into the disk cache; return True if it was written"""
+    lang, code, theme = block
+    path = disk_path(highlight_key(lang, code, theme))
+    if os.path.exists(path):
+        return False
+    highlighted = render_highlighted(code, lang, theme)
+    if highlighted is None:
+        return False
+    _write_atomic(path, highlighted)
+    return True
+
+
+def prehighlight_wiki(md_files, themes=(DEFAULT_THEME,), jobs=None):
+    """Highlight every fenced code block in the wiki into the disk cache; return the number written"""
+    from personal_wiki.app.utils.render import CODE_BLOCK_PATTERN
+
+    blocks = {}
+    for file_path, _ in iter_md_files(md_files):
+        try:
+            # Large files are streamed in chunks, which never split a fenced block
+            if is_large_file(file_path):
+                chunks = iter_md_chunks(file_path)
+            else:
+                chunks = [read_md_file(file_path)]
+            for content in chunks:
+                for match in CODE_BLOCK_PATTERN.finditer(content):
+                    lang, code = match.group(1).strip(), match.group(2)
+                    for theme in themes:
+                        key = highlight_key(lang, code, theme)
+                        if key not in blocks and not os.path.exists(disk_path(key)):
+                            blocks[key] = (lang, code, theme)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading file {file_path}: {e}")
+            continue
+
+    if not blocks:
+        return 0
+
+    # Spawned, not forked: this runs inside the multithreaded Streamlit server,
+    # and a forked child could inherit locks held by other threads
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        written = sum(pool.map(_highlight_to_disk, blocks.values(), chunksize=32))
+    metrics.incr("code_blocks_prehighlighted", written)
+    return written
+
+
+def start_prehighlight(md_files, themes=(DEFAULT_THEME,)):
+    """Run prehighlight_wiki on a background thread (once per process)"""
+    global _prehighlight_thread
+
+    with _prehighlight_lock:
+        if _prehighlight_thread is not None:
+            return
+        _prehighlight_thread = threading.Thread(
+            target=prehighlight_wiki, args=(md_files, themes), name="wiki-prehighlight", daemon=True
+        )
+        _prehighlight_thread.start()
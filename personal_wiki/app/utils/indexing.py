@@ -0,0 +1,80 @@
+import os
+import re
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.file import (
+    read_md_file,
+    read_md_prefix,
+    iter_md_chunks,
+    is_large_file,
+    iter_md_files,
+    get_file_stats,
+    diff_file_stats,
+    load_snapshot,
+    save_snapshot,
+)
+
+
+def load_index(snapshot_name, index_class, version):
+    """Load an index snapshot, or create an empty index if it is missing or outdated"""
+    index = load_snapshot(snapshot_name)
+    if not isinstance(index, index_class) or getattr(index, "version", None) != version:
+        index = index_class()
+    return index
+
+
+def refresh_index(index, md_files):
+    """Re-index files whose mtime or size changed; return True if anything changed
+
+    Works with any index exposing file_stats, add_document,
+    add_document_chunks and remove_document.
+    """
+    titles = {}
+    for file_path, title in iter_md_files(md_files):
+        titles.setdefault(file_path, title)
+
+    current = get_file_stats(titles)
+    changed, removed = diff_file_stats(index.file_stats, current)
+
+    for file_path in removed:
+        index.remove_document(file_path)
+
+    for file_path in changed:
+        try:
+            if is_large_file(file_path):
+                # Large files are streamed; the title comes from a bounded prefix
+                prefix, _ = read_md_prefix(file_path)
+                title = titles[file_path] or page_title(prefix, file_path)
+                index.add_document_chunks(file_path, iter_md_chunks(file_path), title, current[file_path])
+            else:
+                content = read_md_file(file_path)
+                title = titles[file_path] or page_title(content, file_path)
+                index.add_document(file_path, content, title, current[file_path])
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error indexing file {file_path}: {e}")
+            continue
+        metrics.incr("files_indexed")
+
+    return bool(changed or removed)
+
+
+def refresh_snapshot(snapshot_name):
+    """Return a refresh function that updates an index and persists it when it changed"""
+    def refresh(index, md_files):
+        changed = refresh_index(index, md_files)
+        if changed:
+            save_snapshot(snapshot_name, index)
+        return changed
+    return refresh
+
+
+def page_title(content, file_path):
+    """Return the first H1 of a page, falling back to a title built from its file name"""
+    match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+    if match:
+        return match.group(1).strip()
+    return os.path.basename(file_path).replace('.md', '').replace('-', ' ').title()
+
+
+def title_case(name):
+    """Convert kebab-case or snake_case to Title Case, like the shell scripts do"""
+    return " ".join(word[:1].upper() + word[1:] for word in re.split(r"[-_]+", name) if word)
@@ -0,0 +1,135 @@
+import os
+import re
+from personal_wiki.app.utils.file import path_exists
+from personal_wiki.app.utils.indexing import load_index, refresh_snapshot
+from personal_wiki.app.utils.service import SharedIndex
+
+# Bump when the on-disk layout of the graph changes
+LINK_GRAPH_VERSION = 2
+
+LINK_GRAPH_SNAPSHOT = "link_graph.pickle"
+
+# Inline ./ links (not images), with an optional title after the target
+LINK_PATTERN = re.compile(r'(?<!!)\[[^\]]*\]\((\./[^)\s#]+)(?:#[^)\s]*)?(?:\s+"[^"]*")?\)')
+
+# Fenced code is not rendered as links, so it is skipped
+FENCE_PATTERN = re.compile(r"```.*?```", re.DOTALL)
+
+
+def extract_links(content, file_path):
+    """Return the wiki paths a page links to, resolved the same way as rendering does"""
+    base_dir = os.path.dirname(file_path)
+    content = FENCE_PATTERN.sub("", content)
+    return sorted({
+        os.path.normpath(os.path.join(base_dir, href[2:]))
+        for href in LINK_PATTERN.findall(content)
+    })
+
+
+class LinkGraph:
+    """Outgoing links and backlinks between wiki pages
+
+    Link targets that resolve to no page and no file are kept in dangling,
+    checked once when the linking page is indexed and updated as pages are
+    added or removed, so reporting broken links needs no filesystem calls.
+    """
+
+    def __init__(self):
+        self.version = LINK_GRAPH_VERSION
+        self.docs = {}
+        self.backlinks = {}
+        self.dangling = set()
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def file_stats(self):
+        """Return {path: (mtime, size)} for every indexed page"""
+        return {path: doc["stat"] for path, doc in self.docs.items()}
+
+    def add_document(self, path, content, title, stat):
+        """Record a page's outgoing links, replacing any previous version"""
+        self.add_document_chunks(path, [content], title, stat)
+
+    def add_document_chunks(self, path, chunks, title, stat):
+        """Record the outgoing links of a page given as line-aligned text chunks"""
+        self._drop_links(path)
+
+        links = sorted({link for chunk in chunks for link in extract_links(chunk, path)})
+        for target in links:
+            self.backlinks.setdefault(target, set()).add(path)
+        self.docs[path] = {"title": title, "stat": stat, "links": links}
+
+        # The page now resolves links to it; its own targets are checked once here
+        self.dangling.discard(path)
+        for target in links:
+            if target not in self.docs and target not in self.dangling and not path_exists(target):
+                self.dangling.add(target)
+
+    def remove_document(self, path):
+        """Drop a page's outgoing links (its backlinks stay, as other pages still link to it)"""
+        if not self._drop_links(path):
+            return
+        if path in self.backlinks and not path_exists(path):
+            self.dangling.add(path)
+
+    def _drop_links(self, path):
+        """Remove a page's outgoing links; return False if the page was not indexed"""
+        doc = self.docs.pop(path, None)
+        if doc is None:
+            return False
+        for target in doc["links"]:
+            sources = self.backlinks.get(target)
+            if sources is not None:
+                sources.discard(path)
+                if not sources:
+                    del self.backlinks[target]
+                    self.dangling.discard(target)
+        return True
+
+    def title(self, path):
+        doc = self.docs.get(path)
+        if doc is not None:
+            return doc["title"]
+        return os.path.basename(path).replace(".md", "").replace("-", " ").title()
+
+    def outgoing(self, path):
+        """Return the pages a page links to"""
+        doc = self.docs.get(path)
+        return list(doc["links"]) if doc else []
+
+    def linked_from(self, path):
+        """Return the pages linking to a page"""
+        return sorted(self.backlinks.get(os.path.normpath(path), ()))
+
+    def is_dangling(self, target):
+        """Return True if a link target was neither a known page nor an existing file when indexed"""
+        return target in self.dangling
+
+    def broken_links(self, path=None):
+        """Return [(source, target)] for dangling links, for one page or the whole wiki"""
+        if path is not None:
+            return [(path, target) for target in self.outgoing(path) if target in self.dangling]
+        return sorted(
+            (source, target)
+            for target in self.dangling
+            for source in self.backlinks.get(target, ())
+        )
+
+
+# Shared by every session; readers iterating the graph hold link_graph_service.read()
+link_graph_service = SharedIndex(
+    lambda: load_index(LINK_GRAPH_SNAPSHOT, LinkGraph, LINK_GRAPH_VERSION),
+    refresh_snapshot(LINK_GRAPH_SNAPSHOT),
+)
+
+
+def get_link_graph(md_files):
+    """Return the link graph, loading the snapshot and refreshing changed pages"""
+    return link_graph_service.get(md_files)
+
+
+def get_link_graph_nowait(md_files):
+    """Return the link graph, or None while it is first built in the background"""
+    return link_graph_service.get_nowait(md_files)
@@ -1,22 +1,51 @@
-import markdown
-from bs4 import BeautifulSoup
-import base64
 import os
+import threading
 from html import escape
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.assets import resolve_image
 
-def md_to_html(md_content):
-    """Convert markdown to HTML with extended features"""
-    html = markdown.markdown(
-        md_content, 
-        extensions=[
-            'markdown.extensions.tables',
-            'markdown.extensions.fenced_code',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.nl2br'
-        ]
-    )
-    return html
+# markdown and bs4 are imported on first use to keep startup fast
+
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.tables',
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.toc',
+    'markdown.extensions.nl2br'
+]
+
+# Configured Markdown instances, one set per thread (they are not thread-safe)
+_converters = threading.local()
+
+def get_converter(wiki=False):
+    """Return this thread's Markdown converter, building it on first use"""
+    name = "wiki" if wiki else "plain"
+    converter = getattr(_converters, name, None)
+    if converter is None:
+        import markdown
+
+        extensions = list(MARKDOWN_EXTENSIONS)
+        if wiki:
+            from personal_wiki.app.utils.wiki_extension import WikiExtension
+            extensions.append(WikiExtension())
+        converter = markdown.Markdown(extensions=extensions)
+        setattr(_converters, name, converter)
+        metrics.incr("markdown_converters_built")
+    return converter
+
+def md_to_html(md_content, current_file=None):
+    """Convert markdown to HTML with extended features
+
+    When current_file is given, ./ links and images are rewritten and code
+    elements normalised during conversion (see WikiExtension), so the
+    output needs no further process_images/process_links passes. Code is
+    highlighted separately and cached (see utils.highlight).
+    """
+    converter = get_converter(wiki=current_file is not None)
+    # Clear per-document state (toc ids, footnotes, ...) left by the previous page
+    converter.reset()
+    if current_file is not None:
+        converter.wiki_current_file = current_file
+    return converter.convert(md_content)
 
 def extract_title(md_content):
     """Extract title from markdown content"""
@@ -28,19 +57,25 @@ def extract_title(md_content):
 
 def process_images(html_content, base_path):
     """Process image links to display them properly"""
+    from bs4 import BeautifulSoup
+
+    metrics.incr("bs4_parses")
     soup = BeautifulSoup(html_content, "html.parser")
     for img in soup.find_all("img"):
         src = img.get("src", "")
         if src.startswith("./"):
             img_path = os.path.join(os.path.dirname(base_path), src[2:])
-            if os.path.exists(img_path):
-                with open(img_path, "rb") as img_file:
-                    encoded = base64.b64encode(img_file.read()).decode()
-                    img["src"] = f"data:image/png;base64,{encoded}"
+            resolved = resolve_image(img_path)
+            if resolved:
+                img["src"] = resolved
+                img["loading"] = "lazy"
     return str(soup)
 
 def process_links(html_content, current_file):
     """Process internal links to make them work in the app"""
+    from bs4 import BeautifulSoup
+
+    metrics.incr("bs4_parses")
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Fix for code blocks - ensure they're properly displayed
@@ -68,6 +103,9 @@ def process_links(html_content, current_file):
 
 def clean_code_blocks(html_content):
     """Clean up code blocks to ensure proper display with special characters"""
+    from bs4 import BeautifulSoup
+
+    metrics.incr("bs4_parses")
     soup = BeautifulSoup(html_content, 'html.parser')
     
     for pre in soup.find_all('pre'):
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("personal_wiki.metrics")
+
+# Emit one structured JSON log line per rerun
+LOG_METRICS = os.environ.get("WIKI_METRICS_LOG", "") == "1"
+
+if LOG_METRICS and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Write the Prometheus text dump to this file after every rerun
+METRICS_FILE = os.environ.get("WIKI_METRICS_FILE", "")
+
+# Serve the Prometheus text dump at http://127.0.0.1:<port>/metrics
+METRICS_PORT = int(os.environ.get("WIKI_METRICS_PORT", "0"))
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_collectors = {}
+_server = None
+
+
+def incr(name, value=1):
+    """Increment a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def record_time(name, seconds):
+    """Add one observation to a timer"""
+    with _lock:
+        timer = _timers.setdefault(name, {"count": 0, "sum": 0.0, "last": 0.0, "max": 0.0})
+        timer["count"] += 1
+        timer["sum"] += seconds
+        timer["last"] = seconds
+        timer["max"] = max(timer["max"], seconds)
+
+
+@contextmanager
+def timed(name, timings=None):
+    """Time the enclosed block into the named timer (and into timings, if given)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record_time(name, elapsed)
+        if timings is not None:
+            timings[name] = elapsed
+
+
+def register_collector(name, collect):
+    """Register a callable returning {field: number} that is sampled on every snapshot"""
+    with _lock:
+        _collectors[name] = collect
+
+
+def snapshot():
+    """Return the current counters, timers and collector values"""
+    with _lock:
+        counters = dict(_counters)
+        timers = {name: dict(timer) for name, timer in _timers.items()}
+        collectors = dict(_collectors)
+
+    gauges = {}
+    for name, collect in collectors.items():
+        try:
+            gauges[name] = collect()
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", name, e)
+    return {"counters": counters, "timers": timers, "gauges": gauges}
+
+
+def _metric_name(name):
+    return "wiki_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render_prometheus(data=None):
+    """Render metrics in the Prometheus text exposition format"""
+    data = data or snapshot()
+    lines = []
+
+    for name, value in sorted(data["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    if data["timers"]:
+        lines.append("# TYPE wiki_stage_seconds summary")
+        for name, timer in sorted(data["timers"].items()):
+            lines.append(f'wiki_stage_seconds_sum{{stage="{name}"}} {timer["sum"]}')
+            lines.append(f'wiki_stage_seconds_count{{stage="{name}"}} {timer["count"]}')
+        lines.append("# TYPE wiki_stage_last_seconds gauge")
+        for name, timer in sorted(data["timers"].items()):
+            lines.append(f'wiki_stage_last_seconds{{stage="{name}"}} {timer["last"]}')
+
+    for name, fields in sorted(data["gauges"].items()):
+        for field, value in sorted(fields.items()):
+            if isinstance(value, (int, float)):
+                metric = _metric_name(f"{name}_{field}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Atomically write the Prometheus text dump to a file"""
+    # Imported here: utils.file itself records metrics
+    from personal_wiki.app.utils.file import write_text_atomic
+
+    # Each writer gets its own temp file, so concurrent sessions never clobber one another
+    write_text_atomic(path, render_prometheus())
+
+
+def record_rerun(timings, **fields):
+    """Finish a rerun: count it, log it as JSON and refresh the Prometheus outputs"""
+    incr("reruns")
+
+    if LOG_METRICS:
+        event = {"event": "rerun", "ts": time.time()}
+        event.update({f"{name}_ms": round(seconds * 1000, 3) for name, seconds in timings.items()})
+        event.update(fields)
+        logger.info(json.dumps(event, sort_keys=True))
+
+    if METRICS_FILE:
+        try:
+            write_prometheus(METRICS_FILE)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", METRICS_FILE, e)
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port):
+    """Start the /metrics endpoint on a daemon thread (once per process)"""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Could not start metrics server on port %s: %s", port, e)
+            _server = False
+            return None
+
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
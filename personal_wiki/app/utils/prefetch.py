@@ -0,0 +1,112 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.file import iter_md_files
+from personal_wiki.app.utils.render import render_cache, render_key, get_rendered_segments
+from personal_wiki.app.utils.sections import SECTION_THRESHOLD_KB
+
+# Render the pages a page links to in the background after it is shown
+PREFETCH = os.environ.get("WIKI_PREFETCH", "") == "1"
+
+# Also prefetch the pages next to it in the sidebar
+PREFETCH_SIBLINGS = os.environ.get("WIKI_PREFETCH_SIBLINGS", "") == "1"
+
+# Background threads rendering prefetched pages
+PREFETCH_WORKERS = int(os.environ.get("WIKI_PREFETCH_WORKERS", "2"))
+
+# Most pages queued or rendering at any time; further requests are dropped
+PREFETCH_MAX_PENDING = int(os.environ.get("WIKI_PREFETCH_MAX_PENDING", "16"))
+
+# Bytes of markdown read per prefetch request, in kilobytes
+PREFETCH_BUDGET_KB = float(os.environ.get("WIKI_PREFETCH_BUDGET_KB", "2048"))
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="wiki-prefetch")
+        return _executor
+
+
+def prefetch_candidates(file_path, md_files, siblings=PREFETCH_SIBLINGS):
+    """Return the pages worth rendering ahead of a visit to file_path, most likely first"""
+    from personal_wiki.app.utils.link_graph import get_link_graph_nowait, link_graph_service
+
+    # Nothing is known to be linked until the link graph's first build finishes
+    graph = get_link_graph_nowait(md_files)
+    candidates = []
+    if graph is not None:
+        with link_graph_service.read():
+            candidates = [target for target in graph.outgoing(file_path) if target.endswith(".md")]
+
+    if siblings:
+        page_dir = os.path.dirname(file_path)
+        candidates.extend(path for path, _ in iter_md_files(md_files) if os.path.dirname(path) == page_dir)
+
+    seen = {file_path}
+    ordered = []
+    for path in candidates:
+        if path not in seen:
+            seen.add(path)
+            ordered.append(path)
+    return ordered
+
+
+def _prefetch_page(file_path):
+    try:
+        get_rendered_segments(file_path)
+        metrics.incr("prefetch_rendered")
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error prefetching {file_path}: {e}")
+    finally:
+        with _lock:
+            _pending.discard(file_path)
+
+
+def prefetch_linked_pages(file_path, md_files, siblings=PREFETCH_SIBLINGS):
+    """Queue uncached linked (and optionally sibling) pages for background rendering
+
+    Returns the pages queued. Pages already rendered, already queued or
+    missing are skipped, as are pages large enough to be shown section by
+    section, since those are never rendered whole; queuing stops at the pending cap or once the I/O
+    budget for this call is spent.
+    """
+    budget = PREFETCH_BUDGET_KB * 1024
+    queued = []
+
+    for path in prefetch_candidates(file_path, md_files, siblings):
+        try:
+            key = render_key(path)
+        except OSError:
+            continue
+        if key in render_cache:
+            continue
+
+        size = key[2]
+        if size > SECTION_THRESHOLD_KB * 1024:
+            metrics.incr("prefetch_skipped_large")
+            continue
+        if size > budget:
+            metrics.incr("prefetch_skipped_budget")
+            continue
+
+        with _lock:
+            if path in _pending:
+                continue
+            if len(_pending) >= PREFETCH_MAX_PENDING:
+                metrics.incr("prefetch_skipped_busy")
+                break
+            _pending.add(path)
+
+        budget -= size
+        _get_executor().submit(_prefetch_page, path)
+        queued.append(path)
+
+    metrics.incr("prefetch_queued", len(queued))
+    return queued
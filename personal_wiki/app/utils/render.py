@@ -0,0 +1,96 @@
+import os
+import re
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.cache import LRUCache
+from personal_wiki.app.utils.file import read_md_file, file_stat
+from personal_wiki.app.utils.markdown import md_to_html
+from personal_wiki.app.utils.service import SingleFlight, register_cache
+
+# Memory budget for rendered pages, in megabytes
+RENDER_CACHE_MB = float(os.environ.get("WIKI_RENDER_CACHE_MB", "64"))
+
+# Match fenced code blocks with language specifier
+CODE_BLOCK_PATTERN = re.compile(r"```([a-zA-Z0-9_+-]*)\n(.*?)```", re.DOTALL)
+
+# Rendered segment lists keyed by (path, mtime, size)
+render_cache = LRUCache(int(RENDER_CACHE_MB * 1024 * 1024))
+metrics.register_collector("render_cache", render_cache.stats)
+register_cache("render", render_cache, weight=4)
+
+# Concurrent misses for the same page share one render
+_render_flight = SingleFlight()
+
+
+def render_segments(md_content, file_path):
+    """Render markdown into a list of ("html", html) and ("code", lang, code) segments"""
+    # Extract and store code blocks
+    code_blocks = []
+    content_parts = []
+
+    # Process the markdown content
+    last_end = 0
+    for match in CODE_BLOCK_PATTERN.finditer(md_content):
+        # Add text before this code block
+        if match.start() > last_end:
+            content_parts.append(md_content[last_end:match.start()])
+
+        # Add a placeholder for the code block
+        lang = match.group(1).strip()
+        code = match.group(2)
+        code_blocks.append((lang, code))
+        content_parts.append(f"CODE_BLOCK_{len(code_blocks) - 1}")
+
+        last_end = match.end()
+
+    # Add any remaining content
+    if last_end < len(md_content):
+        content_parts.append(md_content[last_end:])
+
+    # Join all non-code parts
+    processed_md = "".join(content_parts)
+
+    # Convert to HTML, rewriting links/images in the same pass
+    html_content = md_to_html(processed_md, file_path)
+
+    # Split by code block placeholders
+    html_parts = html_content.split("CODE_BLOCK_")
+    segments = []
+
+    if html_parts[0].strip():
+        segments.append(("html", html_parts[0]))
+
+    # Each code block is followed by the content up to the next one
+    for block_num, part in enumerate(html_parts[1:]):
+        lang, code = code_blocks[block_num]
+        segments.append(("code", lang, code))
+
+        # Find where the actual content starts
+        content_start = part.find(">") + 1 if ">" in part else 0
+        if part[content_start:].strip():
+            segments.append(("html", part[content_start:]))
+
+    return segments
+
+
+def render_key(file_path):
+    """Return the render cache key of a file: (path, mtime, size)"""
+    mtime, size = file_stat(file_path)
+    return (file_path, mtime, size)
+
+
+def get_rendered_segments(file_path, md_content=None):
+    """Return rendered segments for a file, reusing the cache while it is unchanged"""
+    key = render_key(file_path)
+
+    segments = render_cache.get(key)
+    if segments is None:
+        def render():
+            content = md_content if md_content is not None else read_md_file(file_path)
+            with metrics.timed("render"):
+                rendered = render_segments(content, file_path)
+            render_cache.put(key, rendered)
+            return rendered
+
+        segments = _render_flight.do(key, render)
+
+    return segments
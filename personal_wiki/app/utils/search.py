@@ -1,71 +1,260 @@
 import os
 import re
-from personal_wiki.app.utils.file import read_md_file
-
-def search_wiki_content(search_term, md_files):
-    """Search markdown files for content matching search term"""
-    results = []
-    term_lower = search_term.lower()
-    
-    # Search function to process each file
-    def search_file(file_path, title=None):
+import mmap
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.file import read_md_file, iter_md_files, get_archive, is_large_file, CACHE_DIR
+from personal_wiki.app.utils.indexing import load_index, refresh_snapshot
+from personal_wiki.app.utils.service import SharedIndex
+from personal_wiki.app.utils.search_index import SearchIndex, INDEX_VERSION, tokenize
+from personal_wiki.app.utils.trigram_index import TrigramIndex, TRIGRAM_INDEX_VERSION, required_literals
+
+# Snapshot file for the persisted inverted index
+SEARCH_INDEX_SNAPSHOT = "search_index.pickle"
+
+# Snapshot file for the trigram index used by fuzzy, substring and regex search
+TRIGRAM_INDEX_SNAPSHOT = "trigram_index.pickle"
+
+# Supported search modes; all but "ranked" use the trigram index
+SEARCH_MODES = ("ranked", "fuzzy", "substring", "regex")
+
+# Maximum number of ranked results returned to the sidebar
+MAX_RESULTS = 50
+
+# Worker threads used by the streaming scan until an index exists
+SCAN_WORKERS = int(os.environ.get("WIKI_SCAN_WORKERS", "8"))
+
+# Process-wide indexes shared by every session, loaded from their snapshots on first use
+search_index_service = SharedIndex(
+    lambda: load_index(SEARCH_INDEX_SNAPSHOT, SearchIndex, INDEX_VERSION),
+    refresh_snapshot(SEARCH_INDEX_SNAPSHOT),
+)
+trigram_index_service = SharedIndex(
+    lambda: load_index(TRIGRAM_INDEX_SNAPSHOT, TrigramIndex, TRIGRAM_INDEX_VERSION),
+    refresh_snapshot(TRIGRAM_INDEX_SNAPSHOT),
+)
+
+
+def get_search_index(md_files):
+    """Return the search index, loading the snapshot and refreshing changed files"""
+    return search_index_service.get(md_files)
+
+
+def get_trigram_index(md_files):
+    """Return the trigram index (built on the first fuzzy/substring/regex query)"""
+    return trigram_index_service.get(md_files)
+
+
+def search_index_ready():
+    """Return True if the index is loaded or a snapshot can be loaded quickly"""
+    if search_index_service.loaded():
+        return True
+    return os.path.exists(os.path.join(CACHE_DIR, SEARCH_INDEX_SNAPSHOT))
+
+
+def start_index_build(md_files):
+    """Build the search index on a background thread (once at a time)"""
+    search_index_service.start_build(md_files)
+
+
+def search_wiki_content(search_term, md_files, limit=MAX_RESULTS):
+    """Search markdown files for content matching search term, best matches first"""
+    return list(iter_search_results(search_term, md_files, limit))
+
+
+def iter_search_results(search_term, md_files, limit=MAX_RESULTS, mode="ranked"):
+    """Yield search results as they become available
+
+    In "ranked" mode results are BM25-ranked. Until that index exists it
+    is built in the background and files are scanned concurrently instead,
+    yielding hits in the order they are found. The other modes use the
+    trigram index (see iter_trigram_results).
+    """
+    metrics.incr("searches")
+    with metrics.timed("search"):
+        if mode != "ranked":
+            yield from iter_trigram_results(search_term, md_files, limit, mode)
+            return
+
+        if not search_index_ready():
+            start_index_build(md_files)
+            yield from iter_scan_results(search_term, md_files, top_n=limit)
+            return
+
+        index = get_search_index(md_files)
+        terms = tokenize(search_term)
+
+        # Rank under the read lock; snippets come from the files afterwards
+        with search_index_service.read():
+            ranked = [
+                (file_path, score, index.docs[file_path]['title'])
+                for file_path, score in index.search(search_term, limit=limit)
+            ]
+
+        for file_path, score, title in ranked:
+            yield {
+                'path': file_path,
+                'title': title,
+                'score': score,
+                'snippet': result_snippet(file_path, search_term.lower(), terms),
+            }
+
+
+def iter_trigram_results(search_term, md_files, limit=MAX_RESULTS, mode="fuzzy"):
+    """Yield fuzzy, substring or regex matches using trigram candidate selection"""
+    index = get_trigram_index(md_files)
+
+    if mode == "fuzzy":
+        with trigram_index_service.read():
+            matches = [
+                (file_path, score, words, index.docs[file_path]['title'])
+                for file_path, score, words in index.fuzzy_search(search_term, limit=limit)
+            ]
+        for file_path, score, words, title in matches:
+            yield {
+                'path': file_path,
+                'title': title,
+                'score': score,
+                'snippet': result_snippet(file_path, words[0], words),
+            }
+        return
+
+    if mode == "regex":
         try:
-            content = read_md_file(file_path).lower()
-            if term_lower in content:
-                # If no title provided, extract it from content
-                if not title:
-                    match = re.search(r'^#\s+(.+)$', content, re.MULTILINE | re.IGNORECASE)
-                    if match:
-                        title = match.group(1)
-                    else:
-                        title = os.path.basename(file_path).replace('.md', '').replace('-', ' ').title()
-                
-                results.append({
-                    'path': file_path,
-                    'title': title,
-                    'snippet': extract_snippet(content, term_lower)
-                })
-        except Exception as e:
-            print(f"Error searching file {file_path}: {e}")
-    
-    # Process each category
-    for category_name, category_data in md_files.items():
-        # Search category main file
-        search_file(category_data['path'], category_name.capitalize())
-        
-        # Search files in category
-        for file_name, file_path in category_data['files'].items():
-            search_file(file_path)
-        
-        # Search subcategories
-        if 'subcategories' in category_data:
-            for subcategory_name, subcategory_data in category_data['subcategories'].items():
-                # Search subcategory index
-                if 'index' in subcategory_data:
-                    search_file(subcategory_data['index'], f"{subcategory_name.capitalize()} Index")
-                
-                # Search files in subcategory
-                for subfile_name, subfile_path in subcategory_data.get('files', {}).items():
-                    search_file(subfile_path)
-    
-    return results
+            pattern = re.compile(search_term.encode("utf-8"), re.IGNORECASE | re.MULTILINE)
+        except re.error:
+            return
+        literals = required_literals(search_term)
+    else:
+        pattern = re.compile(re.escape(search_term.encode("utf-8")), re.IGNORECASE)
+        literals = [search_term.lower()]
+
+    with trigram_index_service.read():
+        candidates = [
+            (file_path, index.docs[file_path]['title'])
+            for file_path in sorted(index.candidates_for_literals(literals))
+        ]
+
+    # Candidates are a superset; verify each against the file itself
+    found = 0
+    for file_path, title in candidates:
+        result = scan_file(file_path, title, pattern)
+        if result is None:
+            continue
+        yield result
+        found += 1
+        if limit is not None and found >= limit:
+            return
+
+
+def iter_scan_results(search_term, md_files, top_n=MAX_RESULTS, workers=SCAN_WORKERS):
+    """Scan files in a thread pool and yield matches as found, stopping after top_n"""
+    # Case-insensitive matching works on the raw bytes (ASCII case folding)
+    pattern = re.compile(re.escape(search_term.encode("utf-8")), re.IGNORECASE)
+
+    titles = {}
+    for file_path, title in iter_md_files(md_files):
+        titles.setdefault(file_path, title)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wiki-scan")
+    try:
+        futures = [pool.submit(scan_file, file_path, title, pattern) for file_path, title in titles.items()]
+        found = 0
+        for future in as_completed(futures):
+            result = future.result()
+            if result is None:
+                continue
+            yield result
+            found += 1
+            if top_n is not None and found >= top_n:
+                break
+    finally:
+        # Stop scanning once the consumer has enough results or goes away
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def scan_file(file_path, title, pattern, chars=50):
+    """Search one file through mmap without copying it; return a result dict or None"""
+    try:
+        archive = get_archive()
+        if archive is not None and file_path in archive:
+            # The archive is already mapped; search the file's bytes directly
+            return scan_buffer(file_path, title, pattern, archive.read_bytes(file_path), chars)
+
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return scan_buffer(file_path, title, pattern, mm, chars)
+    except (OSError, ValueError) as e:
+        print(f"Error searching file {file_path}: {e}")
+        return None
+
+
+def scan_buffer(file_path, title, pattern, data, chars=50):
+    """Search a file's bytes (or a map of them); return a result dict or None"""
+    metrics.incr("bytes_scanned", len(data))
+    match = pattern.search(data)
+    if match is None:
+        return None
+
+    if not title:
+        heading = re.search(rb'^#[ \t]+(.+?)\s*$', data, re.MULTILINE)
+        if heading:
+            title = heading.group(1).decode("utf-8", "replace")
+        else:
+            title = os.path.basename(file_path).replace('.md', '').replace('-', ' ').title()
+
+    start = max(0, match.start() - chars)
+    end = min(len(data), match.end() + chars)
+    snippet = data[start:end].decode("utf-8", "ignore").lower()
+    if start > 0:
+        snippet = f"...{snippet}"
+    if end < len(data):
+        snippet = f"{snippet}..."
+
+    return {'path': file_path, 'title': title, 'score': None, 'snippet': snippet}
+
+
+def result_snippet(file_path, term_lower, terms):
+    """Build a snippet around the full search term, or the first query term found"""
+    if is_large_file(file_path):
+        # Search the mapped bytes rather than reading and lowercasing the whole page
+        for candidate in [term_lower] + terms:
+            pattern = re.compile(re.escape(candidate.encode("utf-8")), re.IGNORECASE)
+            result = scan_file(file_path, file_path, pattern)
+            if result:
+                return result["snippet"]
+        return ""
+
+    try:
+        content = read_md_file(file_path).lower()
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+    for candidate in [term_lower] + terms:
+        snippet = extract_snippet(content, candidate)
+        if snippet:
+            return snippet
+    return ""
+
 
 def extract_snippet(content, search_term, chars=50):
     """Extract a snippet of text around the search term"""
     position = content.find(search_term)
     if position == -1:
         return ""
-    
+
     start = max(0, position - chars)
     end = min(len(content), position + len(search_term) + chars)
-    
+
     # Get the snippet
     snippet = content[start:end]
-    
+
     # Add ellipsis if needed
     if start > 0:
         snippet = f"...{snippet}"
     if end < len(content):
         snippet = f"{snippet}..."
-    
-    return snippet
\ No newline at end of file
+
+    return snippet
@@ -0,0 +1,123 @@
+import math
+import re
+from collections import Counter
+
+# Bump when the on-disk layout of the index changes
+INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over wiki pages with BM25 ranking
+
+    Postings map each term to {path: term frequency}. Per-document
+    metadata keeps the (mtime, size) the document was indexed at so the
+    index can be refreshed incrementally.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.version = INDEX_VERSION
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.docs = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def file_stats(self):
+        """Return {path: (mtime, size)} for every indexed document"""
+        return {path: doc["stat"] for path, doc in self.docs.items()}
+
+    def add_document(self, path, content, title, stat):
+        """Index a document, replacing any previous version of it"""
+        self.add_document_chunks(path, [content], title, stat)
+
+    def add_document_chunks(self, path, chunks, title, stat):
+        """Index a document given as line-aligned text chunks"""
+        if path in self.docs:
+            self.remove_document(path)
+
+        counts = Counter()
+        for chunk in chunks:
+            counts.update(tokenize(chunk))
+        for term, freq in counts.items():
+            self.postings.setdefault(term, {})[path] = freq
+
+        length = sum(counts.values())
+        self.docs[path] = {
+            "title": title,
+            "length": length,
+            "stat": stat,
+            "terms": list(counts),
+        }
+        self.total_length += length
+
+    def remove_document(self, path):
+        """Drop a document and its postings from the index"""
+        doc = self.docs.pop(path, None)
+        if doc is None:
+            return
+
+        for term in doc["terms"]:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(path, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= doc["length"]
+
+    def search(self, query, limit=None):
+        """Return [(path, score)] for the query, best matches first"""
+        scores = self.score(set(tokenize(query)))
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return ranked
+
+    def score(self, terms, candidates=None):
+        """Return {path: BM25 score} for documents containing any of the terms
+
+        When candidates is given, only those documents are scored.
+        """
+        if not terms or not self.docs:
+            return {}
+
+        doc_count = len(self.docs)
+        avg_length = self.total_length / doc_count or 1
+        scores = {}
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            # BM25 idf, floored so very common terms never score negative
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+            if candidates is not None and len(candidates) < len(postings):
+                matches = ((path, postings[path]) for path in candidates if path in postings)
+            else:
+                matches = postings.items()
+                if candidates is not None:
+                    matches = ((path, freq) for path, freq in matches if path in candidates)
+
+            for path, freq in matches:
+                length = self.docs[path]["length"]
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[path] = scores.get(path, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def expand_prefix(self, prefix, terms=None):
+        """Return the indexed terms starting with prefix, searching terms instead of the vocabulary if given"""
+        return [term for term in (self.postings if terms is None else terms) if term.startswith(prefix)]
@@ -0,0 +1,281 @@
+import os
+import re
+import time
+import heapq
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.cache import LRUCache
+from personal_wiki.app.utils.search import (
+    get_search_index,
+    get_trigram_index,
+    search_index_ready,
+    start_index_build,
+    search_index_service,
+    trigram_index_service,
+    iter_scan_results,
+    result_snippet,
+    scan_file,
+)
+from personal_wiki.app.utils.search_index import tokenize
+from personal_wiki.app.utils.trigram_index import required_literals
+
+# Results shown per page of search results
+SEARCH_PAGE_SIZE = int(os.environ.get("WIKI_SEARCH_PAGE_SIZE", "10"))
+
+# Recent queries whose result sets each session keeps for reuse
+RECENT_QUERIES = int(os.environ.get("WIKI_RECENT_QUERIES", "16"))
+
+# Keystrokes closer together than this are coalesced into one search, in milliseconds
+SEARCH_DEBOUNCE_MS = float(os.environ.get("WIKI_SEARCH_DEBOUNCE_MS", "250"))
+
+# The last word of a ranked query matches as a prefix once it is this long
+PREFIX_MIN_CHARS = 2
+
+
+def parse_query(query):
+    """Split a ranked query into (complete terms, last-word prefix or None)
+
+    The last word is still being typed unless the query ends in a
+    non-word character, so it matches every term it is a prefix of.
+    """
+    terms = tokenize(query)
+    if terms and re.search(r"\w$", query) and len(terms[-1]) >= PREFIX_MIN_CHARS:
+        return terms[:-1], terms[-1]
+    return terms, None
+
+
+class RankedResults:
+    """BM25 results of a query whose last word is a prefix, ranked a page at a time"""
+
+    def __init__(self, query, index, base=None):
+        self.query = query
+        self.terms, self.prefix = parse_query(query)
+        candidates = None
+        if self.prefix is None:
+            self.expanded = []
+        elif base is not None:
+            # A narrowing query only matches terms and documents the broader one matched
+            self.expanded = index.expand_prefix(self.prefix, base.expanded)
+            candidates = base.candidates
+        else:
+            self.expanded = index.expand_prefix(self.prefix)
+        self.scores = index.score(set(self.terms) | set(self.expanded), candidates)
+        self.candidates = frozenset(self.scores)
+        self.titles = {}
+        self.snippets = {}
+
+    def narrows(self, query):
+        """Return True if query only extends this query's prefix"""
+        terms, prefix = parse_query(query)
+        return self.prefix is not None and prefix is not None and terms == self.terms and prefix.startswith(self.prefix)
+
+    def page(self, page, page_size):
+        """Return (results on the page, True if there are more, total matches)"""
+        depth = (page + 1) * page_size
+        top = heapq.nsmallest(depth, self.scores.items(), key=lambda item: (-item[1], item[0]))
+        rows = top[page * page_size:]
+
+        missing = [path for path, _ in rows if path not in self.titles]
+        if missing:
+            with search_index_service.read():
+                index = search_index_service.index
+                for path in missing:
+                    doc = index.docs.get(path)
+                    self.titles[path] = doc["title"] if doc else path
+
+        # Snippets are only made for the rows shown
+        query_terms = self.terms + ([self.prefix] if self.prefix else [])
+        results = []
+        for path, score in rows:
+            if path not in self.snippets:
+                self.snippets[path] = result_snippet(path, self.query.lower(), query_terms)
+            results.append({"path": path, "title": self.titles[path], "score": score, "snippet": self.snippets[path]})
+        return results, len(self.scores) > depth, len(self.scores)
+
+
+class FuzzyResults:
+    """Fuzzy matches of a query, with snippets made a page at a time"""
+
+    def __init__(self, query, index):
+        self.query = query
+        with trigram_index_service.read():
+            self.matches = [
+                (file_path, score, words, index.docs[file_path]["title"])
+                for file_path, score, words in index.fuzzy_search(query)
+            ]
+        self.snippets = {}
+
+    def narrows(self, query):
+        # A longer word can match different vocabulary, so nothing is reused
+        return False
+
+    def page(self, page, page_size):
+        rows = self.matches[page * page_size:(page + 1) * page_size]
+        results = []
+        for file_path, score, words, title in rows:
+            if file_path not in self.snippets:
+                self.snippets[file_path] = result_snippet(file_path, words[0], words)
+            results.append({"path": file_path, "title": title, "score": score, "snippet": self.snippets[file_path]})
+        return results, len(self.matches) > (page + 1) * page_size, len(self.matches)
+
+
+class ScanResults:
+    """Substring or regex matches, verified against the files only as far as the pages shown
+
+    Candidates come from the trigram index (or a broader query's unrefuted
+    candidates) and are checked in order; refuted ones are remembered so a
+    narrowing query can skip them.
+    """
+
+    def __init__(self, query, mode, index, base=None):
+        self.query = query
+        self.mode = mode
+        self.position = 0
+        self.hits = []
+        self.refuted = set()
+        if mode == "regex":
+            try:
+                self.pattern = re.compile(query.encode("utf-8"), re.IGNORECASE | re.MULTILINE)
+            except re.error:
+                self.pattern = None
+            literals = required_literals(query)
+        else:
+            self.pattern = re.compile(re.escape(query.encode("utf-8")), re.IGNORECASE)
+            literals = [query.lower()]
+
+        self.titles = {}
+        self.candidates = []
+        if self.pattern is None:
+            # An invalid regex matches nothing
+            return
+        if base is not None:
+            self.titles = base.titles
+            self.candidates = [path for path in base.candidates if path not in base.refuted]
+        else:
+            with trigram_index_service.read():
+                for path in index.candidates_for_literals(literals):
+                    self.titles[path] = index.docs[path]["title"]
+            self.candidates = sorted(self.titles)
+
+    def narrows(self, query):
+        # Every file containing the longer string contains this one
+        return self.mode == "substring" and self.query.lower() in query.lower()
+
+    def verify(self, count):
+        """Check candidates until count hits are known or none are left"""
+        while len(self.hits) < count and self.position < len(self.candidates):
+            file_path = self.candidates[self.position]
+            self.position += 1
+            result = scan_file(file_path, self.titles.get(file_path), self.pattern)
+            if result is None:
+                self.refuted.add(file_path)
+            else:
+                self.hits.append(result)
+
+    def page(self, page, page_size):
+        depth = (page + 1) * page_size
+        self.verify(depth + 1)
+        done = self.position >= len(self.candidates)
+        return self.hits[page * page_size:depth], len(self.hits) > depth, len(self.hits) if done else None
+
+
+class StreamResults:
+    """Results of the scan used while the index builds, taken from it only as far as the pages shown
+
+    The total is only known once the scan is exhausted.
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.hits = []
+        self.done = False
+
+    def narrows(self, query):
+        # A partial scan says nothing about the files it has not reached
+        return False
+
+    def fill(self, count):
+        """Take hits from the scan until count are known or it is exhausted"""
+        while not self.done and len(self.hits) < count:
+            hit = next(self.results, None)
+            if hit is None:
+                self.done = True
+            else:
+                self.hits.append(hit)
+
+    def page(self, page, page_size):
+        depth = (page + 1) * page_size
+        self.fill(depth + 1)
+        return self.hits[page * page_size:depth], len(self.hits) > depth, len(self.hits) if self.done else None
+
+
+class QuerySession:
+    """One user's search-as-you-type state
+
+    Result sets of recent queries are kept in a small LRU keyed by mode,
+    query and the index generation. A query that only extends an earlier
+    one filters that query's candidates instead of searching from scratch.
+    """
+
+    def __init__(self, recent=RECENT_QUERIES, debounce_ms=SEARCH_DEBOUNCE_MS):
+        self.recent = LRUCache(recent, sizeof=lambda value: 1)
+        self.debounce_seconds = debounce_ms / 1000
+        self.last_query = None
+        self.last_input = 0.0
+
+    def debounce(self, query, mode):
+        """Return how long to wait before searching a query that was just typed
+
+        Streamlit stops a run when newer input arrives, so a keystroke made
+        during the wait means this query is never searched.
+        """
+        now = time.monotonic()
+        if (query, mode) == self.last_query:
+            return 0.0
+        since = now - self.last_input
+        self.last_query = (query, mode)
+        self.last_input = now
+        return max(0.0, self.debounce_seconds - since)
+
+    def search(self, query, md_files, mode="ranked"):
+        """Return the result set of a query, reusing recent and broader ones"""
+        if mode == "ranked":
+            if not search_index_ready():
+                # Not cached: the scan results are unranked and the index is on its way
+                start_index_build(md_files)
+                return StreamResults(iter_scan_results(query, md_files))
+            index = get_search_index(md_files)
+            generation = search_index_service.generation
+        else:
+            index = get_trigram_index(md_files)
+            generation = trigram_index_service.generation
+
+        key = (mode, generation, query)
+        results = self.recent.get(key)
+        if results is not None:
+            metrics.incr("search_session_hits")
+            return results
+
+        metrics.incr("searches")
+        base = self.find_base(mode, generation, query)
+        with metrics.timed("search"):
+            if base is not None:
+                metrics.incr("search_session_narrowed")
+            if mode == "ranked":
+                with search_index_service.read():
+                    results = RankedResults(query, index, base)
+            elif mode == "fuzzy":
+                results = FuzzyResults(query, index)
+            else:
+                results = ScanResults(query, mode, index, base)
+        self.recent.put(key, results)
+        return results
+
+    def find_base(self, mode, generation, query):
+        """Return the cached result set of the longest shorter query this one narrows, if any"""
+        for end in range(len(query) - 1, 0, -1):
+            key = (mode, generation, query[:end])
+            if key in self.recent:
+                results = self.recent.get(key)
+                if results is not None and results.narrows(query):
+                    return results
+        return None
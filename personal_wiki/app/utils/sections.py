@@ -0,0 +1,109 @@
+import os
+import re
+from personal_wiki.app.utils import metrics
+from personal_wiki.app.utils.file import FENCE_LINE_PATTERN
+from personal_wiki.app.utils.render import render_cache, render_key, render_segments
+
+# Pages larger than this are rendered section by section, in kilobytes
+SECTION_THRESHOLD_KB = float(os.environ.get("WIKI_SECTION_THRESHOLD_KB", "256"))
+
+# Headings up to this level start a new section
+SECTION_LEVEL = int(os.environ.get("WIKI_SECTION_LEVEL", "2"))
+
+# Lines of raw markdown shown per page of the Source view
+SOURCE_PAGE_LINES = int(os.environ.get("WIKI_SOURCE_PAGE_LINES", "500"))
+
+# Bytes of a large file shown before "Load more", in kilobytes
+PREVIEW_KB = float(os.environ.get("WIKI_PREVIEW_KB", "128"))
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+def is_large(md_content):
+    """Return True if a page should be rendered section by section"""
+    return len(md_content) > SECTION_THRESHOLD_KB * 1024
+
+
+def split_sections(md_content, level=SECTION_LEVEL):
+    """Split markdown at headings up to level, skipping fenced code
+
+    Returns [{"title", "level", "start", "end"}] with character offsets
+    into md_content, following the same outline the toc extension builds;
+    text before the first heading becomes an untitled leading section.
+    """
+    sections = []
+    in_fence = False
+    offset = 0
+    for line in md_content.splitlines(keepends=True):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_PATTERN.match(line.rstrip("\r\n"))
+            if match and len(match.group(1)) <= level:
+                sections.append({
+                    "title": match.group(2),
+                    "level": len(match.group(1)),
+                    "start": offset,
+                })
+        offset += len(line)
+
+    if not sections or sections[0]["start"] > 0:
+        sections.insert(0, {"title": "", "level": 0, "start": 0})
+
+    for section, following in zip(sections, sections[1:] + [None]):
+        section["end"] = following["start"] if following else len(md_content)
+    return sections
+
+
+def get_sections(file_path, md_content):
+    """Return the section outline of a page, cached per (path, mtime, size)"""
+    key = ("sections",) + render_key(file_path)
+
+    sections = render_cache.get(key)
+    if sections is None:
+        sections = split_sections(md_content)
+        render_cache.put(key, sections)
+    return sections
+
+
+def get_section_segments(file_path, md_content, section):
+    """Return rendered segments for one section, cached per (path, mtime, size, offset)"""
+    key = ("section",) + render_key(file_path) + (section["start"],)
+
+    segments = render_cache.get(key)
+    if segments is None:
+        with metrics.timed("render_section"):
+            segments = render_segments(md_content[section["start"]:section["end"]], file_path)
+        render_cache.put(key, segments)
+    return segments
+
+
+def preview_text(md_prefix):
+    """Trim a truncated page to its last complete line outside fenced code"""
+    cut = md_prefix.rfind("\n") + 1 or len(md_prefix)
+    fences = list(FENCE_LINE_PATTERN.finditer(md_prefix, 0, cut))
+    if len(fences) % 2:
+        cut = fences[-1].start()
+    return md_prefix[:cut]
+
+
+def get_preview_segments(file_path, md_prefix):
+    """Return rendered segments for the start of a page, cached per (path, mtime, size, length)"""
+    text = preview_text(md_prefix)
+    key = ("preview",) + render_key(file_path) + (len(text),)
+
+    segments = render_cache.get(key)
+    if segments is None:
+        with metrics.timed("render_preview"):
+            segments = render_segments(text, file_path)
+        render_cache.put(key, segments)
+    return segments
+
+
+def source_page(md_content, page, page_lines=SOURCE_PAGE_LINES):
+    """Return (lines of the given Source page, page count)"""
+    lines = md_content.splitlines()
+    page_count = max(1, (len(lines) + page_lines - 1) // page_lines)
+    page = min(max(page, 0), page_count - 1)
+    start = page * page_lines
+    return "\n".join(lines[start:start + page_lines]), page_count
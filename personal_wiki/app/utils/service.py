@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from personal_wiki.app.utils import metrics
+
+# Shared indexes are refreshed at most this often, however many sessions ask
+INDEX_REFRESH_SECONDS = float(os.environ.get("WIKI_INDEX_REFRESH_SECONDS", "1"))
+
+# The wiki tree is revalidated at most this often for all sessions together
+TREE_REFRESH_SECONDS = float(os.environ.get("WIKI_TREE_REFRESH_SECONDS", "1"))
+
+# Total memory for the registered caches, in megabytes (0 keeps each cache's own size)
+MEMORY_BUDGET_MB = float(os.environ.get("WIKI_MEMORY_BUDGET_MB", "0"))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+_tree = None
+_tree_checked = 0.0
+_tree_lock = threading.Lock()
+
+
+class RWLock:
+    """Reader/writer lock: many concurrent readers or one writer, writers first"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+
+        if not leader:
+            metrics.incr("singleflight_shared")
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+class SharedIndex:
+    """A process-wide index shared by every session
+
+    load() creates the index and refresh(index, md_files) brings it up to
+    date. Refreshes happen under the write lock, at most once per
+    INDEX_REFRESH_SECONDS (or when the tree changes), and only one thread
+    refreshes at a time. Readers that iterate the index hold read().
+    generation increases whenever a refresh changed the index (refresh
+    returns False when nothing changed), so results derived from it can
+    be cached against it.
+    """
+
+    def __init__(self, load, refresh):
+        self.load = load
+        self.refresh = refresh
+        self.index = None
+        self.generation = 0
+        self.lock = RWLock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._md_files = None
+        self._build_lock = threading.Lock()
+        self._build_thread = None
+
+    def _fresh(self, md_files):
+        return (
+            self.index is not None
+            and md_files is self._md_files
+            and time.monotonic() - self._refreshed_at < INDEX_REFRESH_SECONDS
+        )
+
+    def get(self, md_files):
+        """Return the index, refreshing it if it is due"""
+        if self._fresh(md_files):
+            return self.index
+
+        with self._refresh_lock:
+            if self._fresh(md_files):
+                return self.index
+            # A new index is only published once its first refresh is done,
+            # so loaded() stays False while it is being built
+            index = self.index if self.index is not None else self.load()
+            with self.lock.write():
+                changed = self.refresh(index, md_files)
+            self.index = index
+            if changed is not False:
+                self.generation += 1
+            self._md_files = md_files
+            self._refreshed_at = time.monotonic()
+        return self.index
+
+    def start_build(self, md_files):
+        """Build the index on a background thread (once at a time)"""
+        with self._build_lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return
+            self._build_thread = threading.Thread(
+                target=self.get, args=(md_files,), name="wiki-index-build", daemon=True
+            )
+            self._build_thread.start()
+
+    def get_nowait(self, md_files):
+        """Return the index, or None while its first build runs in the background
+
+        Once built, the index is refreshed in place as get() does; only the
+        first build, which reads every page, is kept off the caller's thread.
+        """
+        if self.index is None:
+            self.start_build(md_files)
+            return None
+        return self.get(md_files)
+
+    def loaded(self):
+        """Return True once the index has been built or loaded and refreshed"""
+        return self.index is not None
+
+    def read(self):
+        return self.lock.read()
+
+
+def shared_md_files():
+    """Return the wiki tree, revalidated at most once per TREE_REFRESH_SECONDS for all sessions"""
+    global _tree, _tree_checked
+    from personal_wiki.app.utils.file import get_md_files
+
+    if _tree is not None and time.monotonic() - _tree_checked < TREE_REFRESH_SECONDS:
+        return _tree
+
+    with _tree_lock:
+        if _tree is None or time.monotonic() - _tree_checked >= TREE_REFRESH_SECONDS:
+            _tree = get_md_files()
+            _tree_checked = time.monotonic()
+        return _tree
+
+
+def register_cache(name, cache, weight=1):
+    """Put an LRUCache under the global memory budget, sized by its share of the weights"""
+    with _caches_lock:
+        _caches[name] = (cache, weight)
+    apply_memory_budget()
+
+
+def apply_memory_budget(budget_mb=None):
+    """Resize the registered caches to split the budget by weight"""
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    if budget_mb <= 0:
+        return
+
+    with _caches_lock:
+        caches = list(_caches.values())
+    total_weight = sum(weight for _, weight in caches)
+    for cache, weight in caches:
+        cache.resize(int(budget_mb * 1024 * 1024 * weight / total_weight))
+
+
+def memory_stats():
+    """Return the budget and the bytes held by each registered cache"""
+    with _caches_lock:
+        caches = dict(_caches)
+    stats = {"budget_bytes": int(MEMORY_BUDGET_MB * 1024 * 1024)}
+    for name, (cache, _) in caches.items():
+        stats[f"{name}_bytes"] = cache.current_bytes
+    stats["used_bytes"] = sum(cache.current_bytes for cache, _ in caches.values())
+    return stats
+
+
+metrics.register_collector("memory", memory_stats)
@@ -0,0 +1,244 @@
+import re
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from personal_wiki.app.utils.search_index import tokenize
+
+# Bump when the on-disk layout of the index changes
+TRIGRAM_INDEX_VERSION = 1
+
+
+def trigrams(text):
+    """Return the set of lowercase character trigrams in text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(word):
+    """Return the padded trigrams of a single word (so short words still have some)"""
+    return trigrams(f"${word}$")
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (Levenshtein plus transpositions), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_typos(word):
+    """Number of edits tolerated for a query word of this length"""
+    if len(word) <= 4:
+        return 1
+    return 2
+
+
+def required_literals(pattern):
+    """Return literal substrings every match of the regex must contain
+
+    Only top-level literal runs are used; anything more complex simply
+    contributes no constraint, which keeps candidate selection a superset.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+
+    literals = []
+    current = []
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(value))
+            continue
+        if current:
+            literals.append("".join(current))
+            current = []
+    if current:
+        literals.append("".join(current))
+    return [literal.lower() for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex:
+    """Character trigram index over page contents and vocabulary
+
+    Content trigrams narrow candidates for substring and regex queries;
+    word trigrams find vocabulary terms within a few typos of a query
+    word. Candidates are verified against the file contents by the caller.
+    """
+
+    def __init__(self):
+        self.version = TRIGRAM_INDEX_VERSION
+        self.docs = {}
+        self.doc_ids = {}
+        self.paths = []
+        self.free_ids = []
+        self.postings = {}
+        self.word_docs = {}
+        self.word_postings = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def file_stats(self):
+        """Return {path: (mtime, size)} for every indexed document"""
+        return {path: doc["stat"] for path, doc in self.docs.items()}
+
+    def add_document(self, path, content, title, stat):
+        """Index a document, replacing any previous version of it"""
+        self.add_document_chunks(path, [content], title, stat)
+
+    def add_document_chunks(self, path, chunks, title, stat):
+        """Index a document given as line-aligned text chunks"""
+        if path in self.docs:
+            self.remove_document(path)
+
+        if self.free_ids:
+            doc_id = self.free_ids.pop()
+            self.paths[doc_id] = path
+        else:
+            doc_id = len(self.paths)
+            self.paths.append(path)
+        self.doc_ids[path] = doc_id
+
+        grams = set()
+        words = set()
+        for chunk in chunks:
+            grams |= trigrams(chunk)
+            words.update(tokenize(chunk))
+
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(doc_id)
+
+        for word in words:
+            docs = self.word_docs.get(word)
+            if docs is None:
+                docs = self.word_docs[word] = set()
+                for gram in word_trigrams(word):
+                    self.word_postings.setdefault(gram, set()).add(word)
+            docs.add(doc_id)
+
+        self.docs[path] = {"title": title, "stat": stat, "trigrams": list(grams), "words": list(words)}
+
+    def remove_document(self, path):
+        """Drop a document from the index"""
+        doc = self.docs.pop(path, None)
+        if doc is None:
+            return
+        doc_id = self.doc_ids.pop(path)
+        self.paths[doc_id] = None
+        self.free_ids.append(doc_id)
+
+        for gram in doc["trigrams"]:
+            postings = self.postings.get(gram)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self.postings[gram]
+
+        for word in doc["words"]:
+            docs = self.word_docs.get(word)
+            if docs is None:
+                continue
+            docs.discard(doc_id)
+            if not docs:
+                del self.word_docs[word]
+                for gram in word_trigrams(word):
+                    words = self.word_postings.get(gram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self.word_postings[gram]
+
+    def all_paths(self):
+        return [path for path in self.paths if path is not None]
+
+    def candidates_for_literals(self, literals):
+        """Return paths containing every trigram of every literal (all paths if unconstrained)"""
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        if not grams:
+            return self.all_paths()
+
+        # Intersect the rarest postings first to keep the working set small
+        result = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            postings = self.postings.get(gram)
+            if not postings:
+                return []
+            result = set(postings) if result is None else result & postings
+            if not result:
+                return []
+        return [self.paths[doc_id] for doc_id in result]
+
+    def similar_words(self, word):
+        """Return {vocabulary word: distance} for words within max_typos of word"""
+        limit = max_typos(word)
+        grams = word_trigrams(word)
+
+        # Words sharing enough trigrams are candidates for the edit distance check
+        shared = {}
+        for gram in grams:
+            for candidate in self.word_postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        # Each edit can destroy at most three trigrams
+        min_shared = max(1, len(grams) - 3 * limit)
+        matches = {}
+        for candidate, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                matches[candidate] = distance
+        return matches
+
+    def fuzzy_search(self, query, limit=None):
+        """Return [(path, score, matched words)] for documents matching every query word approximately"""
+        words = tokenize(query)
+        if not words:
+            return []
+
+        scores = None
+        matched = {}
+        for word in words:
+            similar = self.similar_words(word)
+            word_scores = {}
+            for candidate, distance in similar.items():
+                weight = 1.0 - distance / (len(word) + 1)
+                for doc_id in self.word_docs.get(candidate, ()):
+                    if weight > word_scores.get(doc_id, 0.0):
+                        word_scores[doc_id] = weight
+                        matched.setdefault(doc_id, {})[word] = candidate
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in word_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.paths[item[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            (self.paths[doc_id], score, sorted(set(matched[doc_id].values())))
+            for doc_id, score in ranked
+        ]
@@ -0,0 +1,99 @@
+import os
+import re
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AtomicString
+from personal_wiki.app.utils.assets import resolve_image
+
+# ./ href and src attributes in raw HTML written into a page
+RAW_LINK_PATTERN = re.compile(r"""(<a\b[^>]*?\shref=)(["'])\./([^"'>]*)\2""", re.IGNORECASE)
+RAW_IMAGE_PATTERN = re.compile(r"""(<img\b[^>]*?\ssrc=)(["'])\./([^"'>]*)\2""", re.IGNORECASE)
+
+
+def wiki_href(current_file, href):
+    """Return the ?file= link of a ./ href relative to the page"""
+    return "?file=" + os.path.normpath(os.path.join(os.path.dirname(current_file), href))
+
+
+class CodeNormalizeTreeprocessor(Treeprocessor):
+    """Reduce <pre><code> elements to plain text before highlighting runs"""
+
+    def run(self, root):
+        for pre in root.iter("pre"):
+            code = pre.find("code")
+            if code is None:
+                continue
+            text = "".join(code.itertext())
+            code.attrib.clear()
+            for child in list(code):
+                code.remove(child)
+            # Kept atomic so inline patterns leave the code alone
+            code.text = AtomicString(text)
+
+
+class WikiLinkTreeprocessor(Treeprocessor):
+    """Rewrite ./ links to ?file= navigation and resolve ./ images
+
+    The page path is read from md.wiki_current_file, so one converter can
+    be reused across documents.
+    """
+
+    def run(self, root):
+        base_dir = os.path.dirname(self.md.wiki_current_file)
+
+        for el in root.iter():
+            if el.tag == "a":
+                href = el.get("href", "")
+                if href.startswith("./"):
+                    # This is a relative link to another wiki file
+                    el.set("href", wiki_href(self.md.wiki_current_file, href[2:]))
+                    el.set("target", "_self")  # Ensure the link stays within the app
+            elif el.tag == "img":
+                src = el.get("src", "")
+                if src.startswith("./"):
+                    resolved = resolve_image(os.path.join(base_dir, src[2:]))
+                    if resolved:
+                        el.set("src", resolved)
+                        el.set("loading", "lazy")
+                        el.set("decoding", "async")
+
+
+class RawHtmlLinkPostprocessor(Postprocessor):
+    """Rewrite ./ links and images in raw HTML before it is put back into the page"""
+
+    def run(self, text):
+        current_file = self.md.wiki_current_file
+        base_dir = os.path.dirname(current_file)
+
+        def link(match):
+            prefix, quote, href = match.groups()
+            return f'{prefix}{quote}{wiki_href(current_file, href)}{quote} target="_self"'
+
+        def image(match):
+            prefix, quote, src = match.groups()
+            resolved = resolve_image(os.path.join(base_dir, src))
+            if not resolved:
+                return match.group(0)
+            return f'{prefix}{quote}{resolved}{quote} loading="lazy" decoding="async"'
+
+        blocks = self.md.htmlStash.rawHtmlBlocks
+        for i, block in enumerate(blocks):
+            if isinstance(block, str):
+                blocks[i] = RAW_IMAGE_PATTERN.sub(image, RAW_LINK_PATTERN.sub(link, block))
+        return text
+
+
+class WikiExtension(Extension):
+    """Python-Markdown extension applying wiki link, image and code rewriting"""
+
+    def extendMarkdown(self, md):
+        # Set by md_to_html before each conversion
+        md.wiki_current_file = ""
+        # Runs before inline patterns (20); fenced code is split out before conversion,
+        # so this only flattens the remaining <pre><code> blocks (e.g. indented code)
+        md.treeprocessors.register(CodeNormalizeTreeprocessor(md), "wiki_code", 31)
+        # Runs after inline patterns (20) have created the <a> and <img> elements
+        md.treeprocessors.register(WikiLinkTreeprocessor(md), "wiki_links", 15)
+        # Runs before raw HTML (30) replaces its placeholders
+        md.postprocessors.register(RawHtmlLinkPostprocessor(md), "wiki_raw_links", 35)
@@ -1,6 +1,5 @@
 import sys
 import os
-import streamlit as st
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))